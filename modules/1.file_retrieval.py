@@ -1,16 +1,18 @@
-from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
-from io import BytesIO, StringIO # to read the raw xlsx or csv file
 import argparse
+import asyncio
+import fcntl  # to serialise git pushes of sources running side by side
+import gzip
+import hashlib
 import json
-import logging
 import os  # to access GitHub repo
-import pandas as pd
-import requests
 import subprocess  # to commit in GitHub repo
 import sys
 
+from pipeline_logging import setup_module_logging
+from sources import DEFAULT_SOURCE, get_source
+
 # ----------------------------------------------------------------------------------------------------
 #                                       setup variables
 # ----------------------------------------------------------------------------------------------------
@@ -18,44 +20,68 @@ import sys
 # Get log file path from orchestrator
 parser = argparse.ArgumentParser()
 parser.add_argument("--log-file", required=True)
+parser.add_argument("--log-port", type=int, help="port of the orchestrator log server")
+parser.add_argument("--log-level", default="INFO")
+parser.add_argument("--source", default=DEFAULT_SOURCE, help="dataset to retrieve (see modules/sources.py)")
 args = parser.parse_args()
 log_file = args.log_file
 
-os.makedirs("data and logs", exist_ok=True)
+# Dataset adapter - link discovery, file reading and per-source config and data folder
+source = get_source(args.source)
 
-# Set up logging for module
-logging.basicConfig(
-    filename=log_file,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s -      Module 1    - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
+os.makedirs(source.data_folder, exist_ok=True)
 
-# Create logger with dummy name so it can be scaled later if needed
-logger = logging.getLogger("log_dog")
+# Set up logging for module (records are queued and sent to the orchestrator's log writer)
+logger = setup_module_logging(log_file, args.log_port, source.stage("Module 1"), args.log_level)
 
 # ----------------
-# url for web scraping
-url = "https://data.nsw.gov.au/data/dataset/fuel-check"
-
 # Set up the file config
-config_file = "config.json"
-with open("config.json") as json_file:
+config_file = source.config_file
+with open(config_file) as json_file:
     config = json.load(json_file)
 
+# url for web scraping
+url = config.get("dataset_url", source.dataset_url)
+
+# maximum number of concurrent HEAD / download requests
+retrieval_concurrency = int(config.get("retrieval_concurrency", 4))
+
 # Create date variables
 latest_file = config["latest_file"]
 nextfile = config["next_file_date"]
 nextfile_dt = datetime.strptime(nextfile, "%b%Y")
-nextfile_month = nextfile_dt.strftime("%b").lower()
-nextfile_year = nextfile_dt.strftime("%Y")
 current_monthyear = datetime.now().replace(day=1).strftime("%b%Y").lower()
 
 # timestamp for commits
 datetimestamp = datetime.now().strftime("%Y%m%d_%Hh%M")
 
-# Set up the file name
-datafile = f"data and logs/fuelcheck_{nextfile}.csv"
+# Cached month -> download links index
+link_index_file = f"{source.data_folder}/link_index.json"
+
+# Source URL, size, ETag, content hash and artifact of every downloaded file
+manifest_file = f"{source.data_folder}/manifest.json"
+
+# Content-addressed store of the gzip compressed monthly CSV files (shared by all sources)
+artifact_folder = "data and logs/artifacts"
+
+# Lock file held while pushing, so sources running side by side do not interleave git commands
+git_lock_file = os.path.join(".git", "pipeline_push.lock")
+
+# Re-check recently loaded months for revised files every `revision_check_days` (0 disables)
+revision_check_days = int(config.get("revision_check_days", 7))
+revision_check_months = int(config.get("revision_check_months", 2))
+last_revision_check = config.get("last_revision_check")
+revision_check_due = revision_check_days > 0 and (
+    last_revision_check is None
+    or datetime.now() - datetime.strptime(last_revision_check, "%Y%m%d_%Hh%M") >= timedelta(days=revision_check_days)
+)
+
+# Months that have ended and can be downloaded (next file first)
+available_months = []
+month_dt = nextfile_dt
+while month_dt.strftime("%b%Y").lower() != current_monthyear and month_dt < datetime.now():
+    available_months.append(month_dt.strftime("%b%Y").lower())
+    month_dt += relativedelta(months=1)
 
 # ----------------------------------------------------------------------------------------------------
 #                                       setup functions
@@ -79,14 +105,16 @@ def push_file_to_repo(file_path, commit_message):
             f"@github.com/{os.environ['GITHUB_REPOSITORY']}.git"
         )
 
-        subprocess.run(["git", "config", "user.name", "github-actions"], check=True)
-        subprocess.run(["git", "config", "user.email", "github-actions@github.com"], check=True)
-        subprocess.run(["git", "add", file_path], check=True)
-        subprocess.run(
-            ["git", "commit", "-m", commit_message],
-            check=False  # won't fail if nothing changed
-        )
-        subprocess.run(["git", "push", repo_url, "HEAD:main"], check=True)
+        with open(git_lock_file, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            subprocess.run(["git", "config", "user.name", "github-actions"], check=True)
+            subprocess.run(["git", "config", "user.email", "github-actions@github.com"], check=True)
+            subprocess.run(["git", "add", file_path], check=True)
+            subprocess.run(
+                ["git", "commit", "-m", commit_message],
+                check=False  # won't fail if nothing changed
+            )
+            subprocess.run(["git", "push", repo_url, "HEAD:main"], check=True)
 
         logger.info(f"Successfully pushed {file_path} to repo")
 
@@ -99,14 +127,14 @@ def save_config():
     """
     Save the current configuration to a JSON file and push it to GitHub.
 
-    Writes the global `config` object to 'config.json' with indentation,
+    Writes the global `config` object to the source's config file with indentation,
     then pushes the file to the repository with a timestamped commit message.
 
     Raises:
         Exception: If writing the file or pushing to GitHub fails.
     """
     try:
-        with open("config.json", "w") as json_file:
+        with open(config_file, "w") as json_file:
             json.dump(config, json_file, indent=4)
         logger.info("Config file updated")
         push_file_to_repo(config_file, f"successful run - configfile updated {datetimestamp}")
@@ -115,54 +143,264 @@ def save_config():
         logger.exception(f"Unexpected error saving json config file: {e}")
 
 
+def load_link_index():
+    """
+    Load the cached month -> download links index.
+
+    Returns:
+        dict[str, list[str]]: Cached links by month (empty if no index exists).
+    """
+    if not os.path.exists(link_index_file):
+        return {}
+    with open(link_index_file) as json_file:
+        return json.load(json_file)
+
+
+def save_link_index(link_index):
+    """
+    Save the month -> download links index and push it to GitHub.
+
+    Args:
+        link_index (dict[str, list[str]]): Links by month.
+    """
+    try:
+        with open(link_index_file, "w") as json_file:
+            json.dump(link_index, json_file, indent=4, sort_keys=True)
+        logger.info("Link index updated")
+        push_file_to_repo(link_index_file, f"link index updated {datetimestamp}")
+
+    except Exception as e:
+        logger.exception(f"Unexpected error saving link index: {e}")
+
+
+def load_manifest():
+    """
+    Load the data file manifest.
+
+    Returns:
+        dict[str, dict]: Manifest entries by month (empty if no manifest exists).
+    """
+    if not os.path.exists(manifest_file):
+        return {}
+    with open(manifest_file) as json_file:
+        return json.load(json_file)
+
+
+def save_manifest(manifest):
+    """
+    Save the data file manifest and push it to GitHub.
+
+    Args:
+        manifest (dict[str, dict]): Manifest entries by month.
+    """
+    try:
+        with open(manifest_file, "w") as json_file:
+            json.dump(manifest, json_file, indent=4, sort_keys=True)
+        logger.info("Manifest updated")
+        push_file_to_repo(manifest_file, f"manifest updated {datetimestamp}")
+
+    except Exception as e:
+        logger.exception(f"Unexpected error saving manifest: {e}")
+
+
+def record_download(manifest, month, link, content, etag):
+    """
+    Record a downloaded file in the manifest.
+
+    Args:
+        manifest (dict[str, dict]): Manifest entries by month (updated in place).
+        month (str): Month of the file, e.g. 'jan2026'.
+        link (str): Source URL the file was downloaded from.
+        content (bytes): Raw file content.
+        etag (str | None): ETag returned by the server.
+
+    Returns:
+        bool: True if the content differs from the previously recorded file for the month.
+    """
+    content_hash = hashlib.sha256(content).hexdigest()
+    previous = manifest.get(month, {})
+    changed = previous.get("sha256") != content_hash
+
+    entry = {
+        "source_url": link,
+        "size": len(content),
+        "etag": etag,
+        "sha256": content_hash,
+        "downloaded": datetimestamp,
+    }
+    # Keep the artifact and transform output hash while the source file is unchanged
+    if not changed:
+        for key in ["artifact", "output_sha256"]:
+            if key in previous:
+                entry[key] = previous[key]
+
+    manifest[month] = entry
+    return changed
+
+
+def artifact_exists(entry):
+    """
+    Check that the artifact recorded in a manifest entry is in the artifact store.
+
+    Args:
+        entry (dict | None): Manifest entry of a month.
+
+    Returns:
+        bool: True if the entry points at an existing artifact.
+    """
+    return bool(entry) and "artifact" in entry and os.path.exists(entry["artifact"])
+
+
+def store_artifact(content):
+    """
+    Write file content gzip compressed to the content-addressed artifact store.
+
+    The file name is the SHA-256 of the uncompressed content and the gzip header
+    carries no timestamp, so identical content always maps to the same file.
+
+    Args:
+        content (bytes): Uncompressed file content.
+
+    Returns:
+        str: Path of the artifact.
+    """
+    file_path = f"{artifact_folder}/{hashlib.sha256(content).hexdigest()}.csv.gz"
+    if os.path.exists(file_path):
+        logger.info(f"artifact {file_path} already stored")
+        return file_path
+
+    os.makedirs(artifact_folder, exist_ok=True)
+    with open(f"{file_path}.tmp", "wb") as artifact_file:
+        artifact_file.write(gzip.compress(content, compresslevel=9, mtime=0))
+    os.replace(f"{file_path}.tmp", file_path)
+
+    logger.info(f"artifact {file_path} stored ({len(content)} bytes uncompressed, {os.path.getsize(file_path)} compressed)")
+    return file_path
+
+
+def save_data_file(link, content):
+    """
+    Convert a downloaded file to a CSV in the transform's schema and save it to the artifact store.
+
+    Args:
+        link (str): Link the file was downloaded from (used to detect the format).
+        content (bytes): Raw file content.
+
+    Returns:
+        str: Path of the compressed CSV artifact.
+    """
+    df = source.normalize(source.read_file(link, content))
+
+    logger.info(f"converting file to csv {link}")
+    return store_artifact(df.to_csv(index=False).encode("utf-8"))
+
+
 # ----------------------------------------------------------------------------------------------------
 #                                     Script Body - Start
 # ----------------------------------------------------------------------------------------------------
-# exit if the most recent file has already been processed
-if current_monthyear == nextfile:
-    logger.info(f"{latest_file} data file already loaded")
+# A new file is due once the month has ended and the latest file has been transformed
+new_file_due = current_monthyear != nextfile and config["latest_file"] == config["last_transformation"]
+
+# exit if there is no new file due and no revision check due
+if not new_file_due and not revision_check_due:
+    # exit if the most recent file has already been processed
+    if current_monthyear == nextfile:
+        logger.info(f"{latest_file} data file already loaded")
+    # exit if the latest file has not yet been transformed
+    else:
+        logger.info(f"{config['latest_file']} file has not yet been transformed")
     sys.exit(10)
 
-# Run requests to connect to website
-logger.info(f"connecting to {url}")
-response = requests.get(url)
-soup = BeautifulSoup(response.text, "html.parser")
-
-# Find links ending with .xlsx or .csv that match last_month_name/last_month_year
-download_links = [
-    a["href"]
-    for a in soup.find_all("a", href=True)
-    if (href := a["href"].lower()).endswith((".xlsx", ".csv"))
-    and nextfile_month in href
-    and nextfile_year in href
-]
+# Heavy imports are only needed once the module has work to do
+from file_downloads import check_revisions, retrieve_months
+
+manifest = load_manifest()
+
+# -------------------- Revision check of recently loaded files
+if revision_check_due:
+    loaded_months = sorted(
+        (month for month, entry in manifest.items()
+         if "source_url" in entry
+         and datetime.strptime(month, "%b%Y") <= datetime.strptime(latest_file, "%b%Y")),
+        key=lambda month: datetime.strptime(month, "%b%Y")
+    )[-revision_check_months:]
+
+    logger.info(f"checking {len(loaded_months)} loaded file(s) for revisions")
+    revisions = asyncio.run(check_revisions({month: manifest[month] for month in loaded_months}, retrieval_concurrency))
+
+    reprocess_months = config.setdefault("reprocess_months", [])
+    for month, (link, content, etag) in revisions.items():
+        if content is None:
+            logger.warning(f"{month} revised file could not be downloaded")
+            continue
+        if record_download(manifest, month, link, content, etag):
+            logger.info(f"{month} file has been revised - queued for reprocessing")
+            manifest[month]["artifact"] = save_data_file(link, content)
+            push_file_to_repo(manifest[month]["artifact"], f"revised data file loaded {datetimestamp}")
+            if month not in reprocess_months:
+                reprocess_months.append(month)
+        else:
+            logger.info(f"{month} file re-published with identical content - skipping")
+
+    config["last_revision_check"] = datetimestamp
+    save_manifest(manifest)
+    save_config()
+
+    if not new_file_due:
+        logger.info("No new file due")
+        sys.exit(0)
+
+# Use cached links if the next file has already been indexed, otherwise read the website
+link_index = load_link_index()
+links_from_index = nextfile in link_index
+
+if links_from_index:
+    logger.info(f"{nextfile} links found in {link_index_file}")
+else:
+    logger.info(f"connecting to {url}")
+    page_links = source.discover_links(url, available_months)
+    if any(link_index.get(month) != links for month, links in page_links.items()):
+        link_index.update(page_links)
+        save_link_index(link_index)
+
+# Find links ending with .xlsx or .csv that match each available month
+links_by_month = {month: link_index.get(month, []) for month in available_months}
+download_links = links_by_month.get(nextfile, [])
 
 # exit if the file is not yet available
 if len(download_links) == 0:
     logger.info(f"{nextfile} file not yet available")
     sys.exit(10)
 
-# exit if the latest file has not yet been transformed
-if config["latest_file"] != config["last_transformation"]:
-    logger.info(f"{config['latest_file']} file has not yet been transformed")
-    sys.exit(10)
-
-link = download_links[0]
-
-logger.info("downloading file from server")
-resp = requests.get(link)
-
-# Read file based on extension
-if link.endswith(".xlsx"):
-    df = pd.read_excel(BytesIO(resp.content))
-elif link.endswith(".csv"):
-    df = pd.read_csv(StringIO(resp.content.decode("utf-8")))
-
-logger.info("converting file to csv")
-df.to_csv(datafile, index=False)
-
-# save the data file
-push_file_to_repo(datafile, f"data file loaded {datetimestamp}")
+# Download the next file plus any later months already published (skipping files downloaded by earlier runs)
+pending_downloads = {
+    month: links
+    for month, links in links_by_month.items()
+    if links and not artifact_exists(manifest.get(month))
+}
+
+logger.info(f"downloading {len(pending_downloads)} file(s) from server")
+downloads = asyncio.run(retrieve_months(pending_downloads, retrieval_concurrency))
+
+for month, (link, content, etag) in downloads.items():
+    if content is None:
+        logger.warning(f"{month} file could not be downloaded")
+        continue
+    record_download(manifest, month, link, content, etag)
+    manifest[month]["artifact"] = save_data_file(link, content)
+    push_file_to_repo(manifest[month]["artifact"], f"data file loaded {datetimestamp}")
+
+if downloads:
+    save_manifest(manifest)
+
+# exit with error if the next file could not be retrieved
+if not artifact_exists(manifest.get(nextfile)):
+    logger.error(f"{nextfile} file could not be downloaded")
+    # drop stale cached links so the next run reads the website again
+    if links_from_index:
+        del link_index[nextfile]
+        save_link_index(link_index)
+    sys.exit(1)
 
 # chage date variable for readability
 latest_file = nextfile
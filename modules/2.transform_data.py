@@ -1,15 +1,19 @@
 # Import necessary libraries
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from sqlalchemy import create_engine
 import argparse
+import glob
 import hashlib
 import json
-import logging
-import numpy as np
 import os
-import pandas as pd
+import shutil
+import fcntl  # to serialise git pushes of sources running side by side
 import subprocess
 import sys
+import time
+
+from pipeline_logging import log_block, rate_limited_debug, setup_module_logging
+from sources import DEFAULT_SOURCE, get_source
 
 # ----------------------------------------------------------------------------------------------------
 #                                       setup variables
@@ -18,31 +22,30 @@ import sys
 # Get log file path from orchestrator
 parser = argparse.ArgumentParser()
 parser.add_argument("--log-file", required=True)
+parser.add_argument("--log-port", type=int, help="port of the orchestrator log server")
+parser.add_argument("--log-level", default="INFO")
+parser.add_argument("--start-date", help="first day to transform in daily mode (YYYY-MM-DD)")
+parser.add_argument("--end-date", help="last day to transform in daily mode (YYYY-MM-DD)")
+parser.add_argument("--force-recompute", action="store_true", help="ignore block checkpoints from a failed run")
+parser.add_argument("--source", default=DEFAULT_SOURCE, help="dataset to transform (see modules/sources.py)")
 args = parser.parse_args()
 log_file = args.log_file
 
-os.makedirs("data and logs", exist_ok=True)
+# Dataset adapter - per-source config, data folder and staging tables
+source = get_source(args.source)
+data_folder = source.data_folder
 
-# Set up logging for module
-logging.basicConfig(
-    filename=log_file,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s -      Module 2    - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
+os.makedirs(data_folder, exist_ok=True)
 
-# Create logger with dummy name so it can be scaled later if needed
-logger = logging.getLogger("log_dog")
+# Set up logging for module (records are queued and sent to the orchestrator's log writer)
+logger = setup_module_logging(log_file, args.log_port, source.stage("Module 2"), args.log_level)
 
 # Load environment variables from GitHub Secrets
 DB_CONNECTION_STRING = os.getenv("DB_CONNECTION_STRING")
 
-# Create database engine
-engine = create_engine(DB_CONNECTION_STRING)
-
 # Set up the file config
-config_file = "config.json"
-with open("config.json") as json_file:
+config_file = source.config_file
+with open(config_file) as json_file:
     config = json.load(json_file)
 
 # Create date variables
@@ -52,6 +55,53 @@ latest_file_month = latest_file_dt.strftime("%b").lower()
 latest_file_year = latest_file_dt.strftime("%Y")
 current_monthyear = datetime.now().replace(day=1).strftime("%b%Y").lower()
 
+# Transform the whole month ("monthly") or only the days since the last run ("daily")
+transform_mode = config.get("transform_mode", "monthly")
+
+# Store dense daily rows ("daily") or one row per unchanged price interval ("intervals")
+output_mode = config.get("output_mode", "daily")
+
+# Engine running Blocks Three and Four ("pandas" or "duckdb") and whether to check it against pandas
+transform_backend = config.get("transform_backend", "pandas")
+verify_backend = config.get("verify_transform_backend", False)
+
+# Revised months queued by module 1 for a targeted reprocess
+reprocess_months = config.get("reprocess_months", [])
+
+# Content hash of each downloaded file and transform output
+manifest_file = f"{data_folder}/manifest.json"
+
+# Block results of an unfinished run, kept until the month is loaded
+checkpoint_root = f"{data_folder}/checkpoints"
+
+# Staging and snapshot tables of the source (NSW keeps the unsuffixed names)
+staging_table = f"stg_fuel_price{source.table_suffix}"
+snapshot_table = f"fuel_price_snapshot{source.table_suffix}"
+
+# Latest closing price snapshot (earlier dates are kept in the snapshot table)
+snapshot_file = f"{data_folder}/price_snapshot.csv"
+
+# Local price history store of the source
+price_history_folder = f"{data_folder}/price_history"
+
+# Lock file held while pushing, so sources running side by side do not interleave git commands
+git_lock_file = os.path.join(".git", "pipeline_push.lock")
+
+# Pre-load validation thresholds (prices in cents per litre, EV in cents per kWh)
+validation_rules = {
+    "price_bounds": {"default": [50, 500]},
+    "max_daily_change": 0.3,
+    "max_price_jump_share": 0.001,
+    **config.get("validation", {})
+}
+
+# CSV station -> stationid matching thresholds (see station_matching.MATCH_RULES)
+station_matching_rules = config.get("station_matching", {})
+
+# Fuzzy station matches are only tried once module 3 has refreshed dim_fuel_stations for the latest file,
+# so a station new this month is not matched to a neighbour
+fuzzy_station_matching = config.get("last_API_call_update") == config.get("latest_file")
+
 # timestamp for commits
 datetimestamp = datetime.now().strftime("%Y%m%d_%Hh%M")
 
@@ -77,20 +127,401 @@ def last_day_of_previous_month(any_date):
         logger.exception(f"Error calculating last day of previous month: {e}")
         raise
 
-# Hash function to create deterministic fingerprint of each row
-def generate_md5_hash(value: str) -> str:
+
+def station_shard(frame, name_column, n_shards):
     """
-    Generate an MD5 hash for a given string.
+    Assign each row to a shard using a hash of its station name and address.
+
+    Args:
+        frame (pd.DataFrame): Data containing a station name column and an 'address' column.
+        name_column (str): Name of the station name column ('servicestationname' or 'name').
+        n_shards (int): Number of shards to partition the data into.
+
+    Returns:
+        pd.Series: Shard number (0 to n_shards - 1) for each row.
+    """
+    station_hash = pd.util.hash_pandas_object(frame[[name_column, 'address']], index=False)
+    return (station_hash % n_shards).astype(int)
+
+
+def transform_shard(folder):
+    """
+    Transform a single station shard in a fresh interpreter.
+
+    The worker is started with exec rather than forked, so it inherits none of the
+    logging threads or locks of this process, and reads its inputs from the shard folder.
 
     Args:
-        value (str): The input string to hash.
+        folder (str): Shard folder written by `save_shard_inputs`.
 
     Returns:
-        str: A 32-character hexadecimal MD5 hash of the input string.
+        pd.DataFrame: Transformed output for the shard.
     """
-    encoded = value.encode("utf-8")  # convert string to bytes (required for hashing)
-    hash_object = hashlib.md5(encoded)  # generate MD5 hash object
-    return hash_object.hexdigest()  # return 32-character hexadecimal string
+    subprocess.run([sys.executable, shard_worker, folder], check=True)
+    return pd.read_parquet(os.path.join(folder, SHARD_OUTPUT))
+
+
+def load_price_snapshot(snapshot_date):
+    """
+    Load the closing price of every station-fuel combination on a given date.
+
+    The local snapshot file is read first, then the local price history store, so no
+    database round trip is needed, falling back to the source's `fuel_price_snapshot` table.
+
+    Args:
+        snapshot_date (datetime.date): Date the snapshot closes on.
+
+    Returns:
+        pd.DataFrame | None: Snapshot with servicestationname, address, fuelcode, price
+        and lastupdated columns, or None if no snapshot exists for the date.
+    """
+    if os.path.exists(snapshot_file):
+        snapshot = pd.read_csv(snapshot_file, parse_dates=['lastupdated'])
+        if 'snapshot_date' in snapshot and (snapshot['snapshot_date'] == f"{snapshot_date:%Y-%m-%d}").all():
+            logger.info(f"Reading price snapshot {snapshot_file}")
+            return snapshot.drop(columns=['snapshot_date'])
+
+    history_prices = prices_on(snapshot_date, price_history_folder)
+    if history_prices is not None:
+        logger.info(f"Read prices for {snapshot_date} from the price history store")
+        return history_prices
+
+    snapshot_query = text(f"""
+    SELECT
+        servicestationname,
+        address,
+        fuelcode,
+        price,
+        lastupdated
+    FROM
+        public.{snapshot_table}
+    WHERE
+        snapshot_date = :snapshot_date
+    """)
+
+    try:
+        snapshot = pd.read_sql(snapshot_query, engine, params={"snapshot_date": snapshot_date})
+    except Exception as e:
+        logger.warning(f"Price snapshot table could not be read: {e}")
+        return None
+
+    if snapshot.empty:
+        return None
+
+    logger.info(f"Read price snapshot for {snapshot_date} from database")
+    snapshot['lastupdated'] = pd.to_datetime(snapshot['lastupdated'])
+    return snapshot
+
+
+def load_active_stations():
+    """
+    Read the active stations the file's station names and addresses are matched to.
+
+    Returns:
+        pd.DataFrame | None: stationid, name and address of every active station, or None
+        if `dim_fuel_stations` could not be read (station matching is then skipped).
+    """
+    station_query = """
+    SELECT
+        stationid,
+        name,
+        address
+    FROM
+        dim_fuel_stations
+    WHERE
+        active = True
+    """
+
+    try:
+        return pd.read_sql(station_query, engine)
+    except Exception as e:
+        logger.warning(f"Stations could not be read - station matching skipped: {e}")
+        return None
+
+
+def match_station_names(frame, stations, name_column='servicestationname', address_column='address'):
+    """
+    Rewrite the station names and addresses of a frame to the `dim_fuel_stations` name and
+    address of their matched stationid, so whitespace or casing drift in the CSV does not
+    create new station-fuel combinations.
+
+    Args:
+        frame (pd.DataFrame): Rows with station name and address columns.
+        stations (pd.DataFrame | None): Active stations from `load_active_stations` (frame returned unchanged when None).
+        name_column (str): Station name column of the frame.
+        address_column (str): Station address column of the frame.
+
+    Returns:
+        pd.DataFrame: The frame with matched names and addresses replaced.
+    """
+    if stations is None:
+        return frame
+
+    matches = resolve_stations(
+        frame[[name_column, address_column]].rename(columns={name_column: 'servicestationname', address_column: 'address'}),
+        stations,
+        match_cache,
+        station_matching_rules,
+        fuzzy=fuzzy_station_matching
+    )
+
+    matched = canonical_station_names(frame, matches, stations, name_column, address_column)
+    before = len(frame[[name_column, address_column]].drop_duplicates())
+    after = len(matched[[name_column, address_column]].drop_duplicates())
+    logger.info(f"{matches['stationid'].notna().sum()} of {len(matches)} stations matched - {before} station strings collapsed to {after}")
+    return matched
+
+
+def build_price_snapshot(output, previous_snapshot):
+    """
+    Build the closing price snapshot from the transformed output.
+
+    Args:
+        output (pd.DataFrame): Final transformed daily prices.
+        previous_snapshot (pd.DataFrame | None): Snapshot the transformation was seeded from,
+            used to carry the last update date of stations with no new prices.
+
+    Returns:
+        pd.DataFrame: One row per station-fuel combination with its closing price and
+        last price update date.
+    """
+    keys = ['servicestationname', 'address', 'fuelcode']
+
+    closing_prices = output.loc[output['date'] == output['date'].max(), keys + ['price']]
+    last_updates = output.groupby(keys)['priceupdateddate'].max().rename('lastupdated').reset_index()
+    snapshot = closing_prices.merge(last_updates, on=keys, how='left')
+
+    # Stations without a price update this month keep their previous update date
+    if previous_snapshot is not None:
+        snapshot = snapshot.merge(
+            previous_snapshot[keys + ['lastupdated']], on=keys, how='left', suffixes=('', '_previous')
+        )
+        snapshot['lastupdated'] = snapshot['lastupdated'].fillna(snapshot['lastupdated_previous'])
+        snapshot = snapshot.drop(columns=['lastupdated_previous'])
+
+    return snapshot.reset_index(drop=True)
+
+
+def save_price_snapshot(snapshot, snapshot_date):
+    """
+    Save the price snapshot to the local snapshot file and the source's `fuel_price_snapshot` table.
+
+    The file only holds the latest snapshot (older dates stay in the table), and the
+    dated snapshot files of earlier versions are deleted, so the repository does not
+    gain a full snapshot every run.
+
+    Args:
+        snapshot (pd.DataFrame): Snapshot created by `build_price_snapshot`.
+        snapshot_date (datetime.date): Date the snapshot closes on.
+    """
+    snapshot.assign(snapshot_date=f"{snapshot_date:%Y-%m-%d}").to_csv(snapshot_file, index=False)
+    logger.info(f"Price snapshot for {snapshot_date} saved to {snapshot_file} with {len(snapshot)} rows")
+    for dated_file in glob.glob(f"{data_folder}/price_snapshot_*.csv"):
+        os.remove(dated_file)
+
+    # The pathspec also stages the removal of dated snapshot files pushed by earlier runs
+    push_file_to_repo(f"{data_folder}/price_snapshot*.csv", f"price snapshot saved {datetimestamp}")
+
+    try:
+        with engine.begin() as connection:
+            if inspect(connection).has_table(snapshot_table):
+                connection.execute(
+                    text(f"DELETE FROM public.{snapshot_table} WHERE snapshot_date = :snapshot_date"),
+                    {"snapshot_date": snapshot_date}
+                )
+            snapshot.assign(snapshot_date=snapshot_date).to_sql(
+                snapshot_table, connection, if_exists='append', index=False
+            )
+    except Exception as e:
+        logger.exception(f"Unexpected error while saving price snapshot to database: {e}")
+
+
+def load_manifest():
+    """
+    Load the data file manifest.
+
+    Returns:
+        dict[str, dict]: Manifest entries by month (empty if no manifest exists).
+    """
+    if not os.path.exists(manifest_file):
+        return {}
+    with open(manifest_file) as json_file:
+        return json.load(json_file)
+
+
+def save_manifest(manifest):
+    """
+    Save the data file manifest and push it to GitHub.
+
+    Args:
+        manifest (dict[str, dict]): Manifest entries by month.
+    """
+    try:
+        with open(manifest_file, "w") as json_file:
+            json.dump(manifest, json_file, indent=4, sort_keys=True)
+        logger.info("Manifest updated")
+        push_file_to_repo(manifest_file, f"manifest updated {datetimestamp}")
+
+    except Exception as e:
+        logger.exception(f"Unexpected error saving manifest: {e}")
+
+
+def generate_output_hash(output):
+    """
+    Generate a SHA-256 hash of the transform output that is independent of row order.
+
+    Args:
+        output (pd.DataFrame): Final transformed output with a record_id column.
+
+    Returns:
+        str: 64-character hexadecimal hash of the sorted record_ids.
+    """
+    return hashlib.sha256("\n".join(sorted(output['record_id'])).encode("utf-8")).hexdigest()
+
+
+def validate_output(output, end_date, rules):
+    """
+    Run vectorized checks on the transform output before it is loaded.
+
+    Checks:
+        - duplicate_record_id: record_ids or station/fuel/date keys occurring more than once
+        - price_out_of_bounds: prices outside the fuelcode's [min, max] bounds
+        - missing_days: days missing between a station-fuel's first day and the last day transformed
+        - price_jump: day-over-day changes larger than `max_daily_change`, rejected only when
+          they exceed `max_price_jump_share` of the rows
+
+    Args:
+        output (pd.DataFrame): Final transformed output.
+        end_date (pd.Timestamp): Last day transformed.
+        rules (dict): Validation thresholds (see `validation_rules`).
+
+    Returns:
+        dict: Summary report with the failed row count and example rows of every check,
+        and the list of checks that reject the output.
+    """
+    keys = ['servicestationname', 'address', 'fuelcode']
+    checks = {}
+
+    # Duplicate record_ids and station/fuel/date keys
+    duplicates = output.duplicated('record_id', keep=False) | output.duplicated(keys + ['date'], keep=False)
+    checks['duplicate_record_id'] = duplicates
+
+    # Price bounds per fuelcode
+    bounds = rules['price_bounds']
+    default_min, default_max = bounds['default']
+    price_min = output['fuelcode'].map({code: bound[0] for code, bound in bounds.items()}).fillna(default_min)
+    price_max = output['fuelcode'].map({code: bound[1] for code, bound in bounds.items()}).fillna(default_max)
+    checks['price_out_of_bounds'] = ~output['price'].between(price_min, price_max)
+
+    # Prices are forward filled, so every station-fuel needs every day from its first day to the end
+    days = output.groupby(keys)['date'].agg(['min', 'count'])
+    days['missing'] = (end_date - days['min']).dt.days + 1 - days['count']
+    missing_days = output.set_index(keys).index.isin(days[days['missing'] != 0].index)
+    checks['missing_days'] = pd.Series(missing_days, index=output.index)
+
+    # Day-over-day price changes
+    ordered = output.sort_values(keys + ['date'])
+    daily_change = ordered.groupby(keys)['price'].pct_change().abs()
+    checks['price_jump'] = (daily_change > rules['max_daily_change']).reindex(output.index)
+
+    report = {"rows": len(output), "end_date": str(end_date.date()), "checks": {}, "rejected": []}
+    for check, failed in checks.items():
+        failed_rows = output[failed]
+        report["checks"][check] = {
+            "failed_rows": len(failed_rows),
+            "examples": failed_rows.head(5).astype(str).to_dict(orient='records')
+        }
+        if check == 'price_jump':
+            if len(failed_rows) > rules['max_price_jump_share'] * len(output):
+                report["rejected"].append(check)
+        elif len(failed_rows):
+            report["rejected"].append(check)
+
+    return report
+
+
+def save_validation_report(report, month):
+    """
+    Save the validation report of a month and push it to GitHub.
+
+    Args:
+        report (dict): Report created by `validate_output`.
+        month (str): Month of the transformed file, e.g. 'jan2026'.
+    """
+    file_path = f"{data_folder}/validation_{month}.json"
+    try:
+        with open(file_path, "w") as json_file:
+            json.dump(report, json_file, indent=4)
+        logger.info(f"Validation report saved to {file_path}")
+        push_file_to_repo(file_path, f"validation report {month} {datetimestamp}")
+
+    except Exception as e:
+        logger.exception(f"Unexpected error saving validation report: {e}")
+
+
+def generate_input_hash(file_path, *parameters):
+    """
+    Generate a SHA-256 hash of the input file and the parameters that change the transform.
+
+    Args:
+        file_path (str): Path of the monthly CSV file.
+        *parameters: Run parameters, e.g. transform mode and date range.
+
+    Returns:
+        str: 64-character hexadecimal hash.
+    """
+    input_hash = hashlib.sha256()
+    with open(file_path, "rb") as input_file:
+        for chunk in iter(lambda: input_file.read(1024 * 1024), b""):
+            input_hash.update(chunk)
+    input_hash.update("|".join(str(parameter) for parameter in parameters).encode("utf-8"))
+    return input_hash.hexdigest()
+
+
+def load_checkpoint(block):
+    """
+    Load the result of a block saved by an earlier run with the same inputs.
+
+    Args:
+        block (str): Checkpoint name, e.g. 'block_one'.
+
+    Returns:
+        pd.DataFrame | None: Saved block result, or None if there is no checkpoint.
+    """
+    file_path = os.path.join(checkpoint_folder, f"{block}.parquet")
+    if not os.path.exists(file_path):
+        return None
+    logger.info(f"Resuming from checkpoint {file_path}")
+    return pd.read_parquet(file_path)
+
+
+def save_checkpoint(frame, block):
+    """
+    Save the result of a block so a failed run can resume after it.
+
+    Args:
+        frame (pd.DataFrame): Block result.
+        block (str): Checkpoint name, e.g. 'block_one'.
+    """
+    try:
+        os.makedirs(checkpoint_folder, exist_ok=True)
+        file_path = os.path.join(checkpoint_folder, f"{block}.parquet")
+        frame.to_parquet(f"{file_path}.tmp", index=False)
+        os.replace(f"{file_path}.tmp", file_path)
+
+    except Exception as e:
+        logger.warning(f"Checkpoint {block} could not be saved: {e}")
+
+
+def clear_checkpoints(month):
+    """
+    Delete every checkpoint of a month.
+
+    Args:
+        month (str): Month of the transformed file, e.g. 'jan2026'.
+    """
+    for folder in glob.glob(os.path.join(checkpoint_root, f"{month}_*")):
+        shutil.rmtree(folder, ignore_errors=True)
 
 
 def push_file_to_repo(file_path, commit_message):
@@ -111,14 +542,16 @@ def push_file_to_repo(file_path, commit_message):
             f"@github.com/{os.environ['GITHUB_REPOSITORY']}.git"
         )
 
-        subprocess.run(["git", "config", "user.name", "github-actions"], check=True)
-        subprocess.run(["git", "config", "user.email", "github-actions@github.com"], check=True)
-        subprocess.run(["git", "add", file_path], check=True)
-        subprocess.run(
-            ["git", "commit", "-m", commit_message],
-            check=False  # won't fail if nothing changed
-        )
-        subprocess.run(["git", "push", repo_url, "HEAD:main"], check=True)
+        with open(git_lock_file, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            subprocess.run(["git", "config", "user.name", "github-actions"], check=True)
+            subprocess.run(["git", "config", "user.email", "github-actions@github.com"], check=True)
+            subprocess.run(["git", "add", file_path], check=True)
+            subprocess.run(
+                ["git", "commit", "-m", commit_message],
+                check=False  # won't fail if nothing changed
+            )
+            subprocess.run(["git", "push", repo_url, "HEAD:main"], check=True)
 
         logger.info(f"Successfully pushed {file_path} to repo")
 
@@ -131,14 +564,14 @@ def save_config():
     """
     Save the current configuration to a JSON file and push it to GitHub.
 
-    Writes the global `config` object to 'config.json' with indentation,
+    Writes the global `config` object to the source's config file with indentation,
     then pushes the file to the repository with a timestamped commit message.
 
     Raises:
         Exception: If writing the file or pushing to GitHub fails.
     """
     try:
-        with open("config.json", "w") as json_file:
+        with open(config_file, "w") as json_file:
             json.dump(config, json_file, indent=4)
         logger.info("Config file updated")
         push_file_to_repo(config_file, f"successful run - configfile updated {datetimestamp}")
@@ -147,15 +580,71 @@ def save_config():
         logger.exception(f"Unexpected error saving json config file: {e}")
 
 
+def save_station_matches():
+    """
+    Save the station match cache and push it to GitHub if the run added mappings.
+
+    Raises:
+        Exception: If writing the file or pushing to GitHub fails.
+    """
+    if match_cache == loaded_match_cache:
+        return
+    try:
+        save_match_cache(match_cache)
+        push_file_to_repo(match_cache_file, f"station matches updated {datetimestamp}")
+
+    except Exception as e:
+        logger.exception(f"Unexpected error saving station match cache: {e}")
+
+
 # ----------------------------------------------------------------------------------------------------
 #                                     Script Body - Start
 # ----------------------------------------------------------------------------------------------------
 
-# exit if the latest file has already been transformed
-if config["latest_file"] == config["last_transformation"]:
+# exit if the latest file has already been transformed and no revised files are queued
+explicit_dates = args.start_date is not None or args.end_date is not None
+new_file_due = config["latest_file"] != config["last_transformation"] or explicit_dates
+if not new_file_due and not reprocess_months:
     logger.info(f"{config['latest_file']} file has already been transformed")
     sys.exit(10)
 
+# Transform the latest file, or the oldest revised month queued for reprocessing
+reprocessing = not new_file_due
+target_file = reprocess_months[0] if reprocessing else latest_file
+target_file_dt = datetime.strptime(target_file, "%b%Y")
+if reprocessing:
+    logger.info(f"Reprocessing revised {target_file} file")
+    transform_mode = "monthly"
+
+# Heavy imports and database engine are only needed once the module has work to do
+from sqlalchemy import create_engine, inspect, text
+import numpy as np
+import pandas as pd
+
+from price_history import prices_on, write_price_history
+from price_intervals import (
+    DENSE_TABLE, INTERVAL_TABLE, clear_staged_range, extend_open_intervals, prepare_interval_tables, price_intervals
+)
+from station_fuel_transform import (
+    SHARD_OUTPUT, save_shard_inputs, transform_station_fuel, transform_station_fuel_duckdb
+)
+
+# Worker script run once per station shard
+shard_worker = os.path.join(os.path.dirname(os.path.abspath(__file__)), "station_fuel_transform.py")
+from station_matching import (
+    canonical_station_names, load_match_cache, match_cache_file, resolve_stations, save_match_cache
+)
+
+interval_table = f"{INTERVAL_TABLE}{source.table_suffix}"
+dense_table = f"{DENSE_TABLE}{source.table_suffix}"
+
+# Station match cache - new mappings are saved once the load has succeeded
+match_cache = load_match_cache()
+loaded_match_cache = dict(match_cache)
+
+# Create database engine
+engine = create_engine(DB_CONNECTION_STRING)
+
 # ----------------------------------------------------------------------------------------------------
 #                                           Block one
 # - Import data
@@ -163,210 +652,457 @@ if config["latest_file"] == config["last_transformation"]:
 # - Convert column to date type
 # ----------------------------------------------------------------------------------------------------
 logger.info(f"Starting Data Transformations")
-
-# Read the file 
-file = f"data and logs/fuelcheck_{latest_file}.csv"
-logger.info(f"Reading {file}")
-
-# Forward-fill missing information (if the file was originally excel the cells can be merged vertically causing issues)
-df_fuel_data = (
-    pd.read_csv(file)
-      .ffill()
-      .copy()
-)
-
-#Convert 'date' to datetime and normalise to reset the time component
-df_fuel_data['date'] = (
-    pd.to_datetime(
-        df_fuel_data['PriceUpdatedDate'],
-        errors='raise'
-    ).dt.normalize()
+block_start = time.perf_counter()
+
+# Read the file - the gzip compressed artifact recorded in the manifest (pandas decompresses it on the fly),
+# or the plain CSV of months downloaded before the artifact store
+file = load_manifest().get(target_file, {}).get("artifact", f"{data_folder}/fuelcheck_{target_file}.csv")
+
+# Active stations the CSV station strings are matched to (sources with station dimension only)
+active_stations = load_active_stations() if source.match_stations else None
+
+# Station matching rewrites the Block One names, so the stations and rules it matched against are inputs too
+# (the match cache is left out: it only gains mappings computed from the same stations and rules)
+station_state = None
+if active_stations is not None:
+    station_hash = pd.util.hash_pandas_object(active_stations.sort_values('stationid'), index=False)
+    station_state = hashlib.sha256(station_hash.to_numpy().tobytes()).hexdigest()
+
+# Checkpoints are keyed by month and a hash of the file and run parameters, so a retry
+# with the same inputs resumes after the last completed block
+input_hash = generate_input_hash(
+    file, transform_mode, args.start_date, args.end_date, config.get("last_transformed_date"),
+    station_state, json.dumps(station_matching_rules, sort_keys=True), fuzzy_station_matching
 )
+checkpoint_folder = os.path.join(checkpoint_root, f"{target_file}_{input_hash[:16]}")
+if args.force_recompute:
+    logger.info(f"Forcing full recompute of {target_file}")
+    clear_checkpoints(target_file)
+
+df_fuel_data = load_checkpoint("block_one")
+if df_fuel_data is None:
+    logger.info(f"Reading {file}")
+
+    # Forward-fill missing information (if the file was originally excel the cells can be merged vertically causing issues)
+    df_fuel_data = (
+        pd.read_csv(file)
+          .ffill()
+          .copy()
+    )
+
+    #Convert 'date' to datetime and normalise to reset the time component
+    df_fuel_data['date'] = (
+        pd.to_datetime(
+            df_fuel_data['PriceUpdatedDate'],
+            errors='raise'
+        ).dt.normalize()
+    )
+
+    # Collapse drifted station names and addresses onto their matched station
+    df_fuel_data = match_station_names(df_fuel_data, active_stations, 'ServiceStationName', 'Address')
+    save_checkpoint(df_fuel_data, "block_one")
+
+# Set the range of days to transform
+if transform_mode == "daily":
+    if args.start_date:
+        start_date = pd.Timestamp(args.start_date)
+    elif config.get("last_transformed_date"):
+        start_date = pd.Timestamp(config["last_transformed_date"]) + timedelta(days=1)
+    else:
+        start_date = df_fuel_data['date'].min()
+    end_date = pd.Timestamp(args.end_date) if args.end_date else df_fuel_data['date'].max()
+
+    # Keep only the new days
+    df_fuel_data = df_fuel_data[df_fuel_data['date'].between(start_date, end_date)].copy()
+
+    # exit if there are no new days to transform
+    if df_fuel_data.empty:
+        logger.info(f"No new days to transform between {start_date.date()} and {end_date.date()}")
+        sys.exit(10)
+
+    logger.info(f"Transforming days {start_date.date()} to {end_date.date()}")
+    seed_date = start_date - timedelta(days=1)
+else:
+    seed_date = df_fuel_data['date'].min() - timedelta(days=1)
+    end_date = df_fuel_data['date'].max()
 
 rowcount = len(df_fuel_data)
 logger.info(f"df_fuel_data has {rowcount} rows")
+log_block(logger, "Block One", block_start, rows=rowcount)
 
 
 # ----------------------------------------------------------------------------------------------------
 #                                           Block Two
 # - Set column headers to lowercase  
 # - Identify unique station and fuel type combinations for current month
-# - Fetch stations and fuel types for the last month
+# - Fetch stations and fuel types from last month snapshot (fact table if no snapshot exists)
 # - Union the two datasets
 # ----------------------------------------------------------------------------------------------------
 
+block_start = time.perf_counter()
+
 # Set column headers to lowercase  
 df_fuel_data.columns = df_fuel_data.columns.str.lower()
 
-# Identify unique station and fuel type combinations
-unique_station_fuelcodes = (
-    df_fuel_data[['servicestationname','address','fuelcode']]
-    .drop_duplicates()
-    .reset_index(drop=True)
-)
+# Calculate the day to seed prices from (last day of the previous month, or the last transformed day)
+if transform_mode == "daily":
+    last_day = seed_date.date()
+else:
+    date = df_fuel_data['date'].min()
+    last_day = last_day_of_previous_month(date)
+
+# Resume from the saved station-fuel combinations and seed snapshot of a failed run with the same inputs
+union_data = load_checkpoint("block_two")
+price_snapshot = load_checkpoint("price_snapshot")
+
+if union_data is None:
+    # Identify unique station and fuel type combinations
+    unique_station_fuelcodes = (
+        df_fuel_data[['servicestationname','address','fuelcode']]
+        .drop_duplicates()
+        .reset_index(drop=True)
+    )
+
+    # Read the closing price snapshot of the seed day
+    price_snapshot = load_price_snapshot(last_day)
+
+    # Snapshots written before station matching can hold drifted strings - keep the latest price per matched station
+    if price_snapshot is not None and active_stations is not None:
+        price_snapshot = (
+            match_station_names(price_snapshot, active_stations)
+            .sort_values('lastupdated', na_position='first')
+            .drop_duplicates(subset=['servicestationname', 'address', 'fuelcode'], keep='last')
+            .reset_index(drop=True)
+        )
 
-# SQL query to fetch active stations and fuel types for the last month
-station_query = f"""
-SELECT DISTINCT
-	name,
-	address,
-	fuelcode
-FROM
-	public.fact_fuel_prices
-	INNER JOIN dim_fuel_stations 
-        ON dim_fuel_stations.stationid = fact_fuel_prices.stationid
-"""
+    if price_snapshot is not None:
+        station_fuelcode_dbo = price_snapshot[['servicestationname','address','fuelcode']]
 
-# Execute the query
-station_fuelcode_dbo = pd.read_sql(station_query, engine)
+    elif not source.seed_from_fact_tables:
+        logger.info(f"No price snapshot for {last_day} - {source.name} starts without seed prices")
+        station_fuelcode_dbo = unique_station_fuelcodes.iloc[0:0]
 
-# Combine unique station-fuel combinations with last month's data and remove duplicates
-union_data = pd.concat([unique_station_fuelcodes, station_fuelcode_dbo]).drop_duplicates().reset_index(drop=True)
+    else:
+        logger.info(f"No price snapshot for {last_day} - querying fact table")
+
+        # SQL query to fetch active stations and fuel types for the last month
+        station_query = f"""
+        SELECT DISTINCT
+            name AS servicestationname,
+            address,
+            fuelcode
+        FROM
+            public.fact_fuel_prices
+            INNER JOIN dim_fuel_stations 
+                ON dim_fuel_stations.stationid = fact_fuel_prices.stationid
+        """
+
+        # Execute the query
+        station_fuelcode_dbo = pd.read_sql(station_query, engine)
+
+    # Combine unique station-fuel combinations with last month's data and remove duplicates
+    union_data = pd.concat([unique_station_fuelcodes, station_fuelcode_dbo]).drop_duplicates().reset_index(drop=True)
+
+    # The snapshot is saved first so a saved union always has its snapshot
+    if price_snapshot is not None:
+        save_checkpoint(price_snapshot, "price_snapshot")
+    save_checkpoint(union_data, "block_two")
+
+log_block(logger, "Block Two", block_start, rows=len(union_data))
 
 # ----------------------------------------------------------------------------------------------------
 #                                           Block Three
 # - Create date_range_df 
-# - Cross join to unique combinations of 'servicestationname','address','fuelcode' defined in Block 2
-# - Get average price per 'servicestationname','address','fuelcode', 'date' from Block 1
 # ----------------------------------------------------------------------------------------------------
 
-# Generate a full date range based on the min and max dates in the dataset
+# Generate a full date range from the seed day to the last day being transformed
 date_range_df = pd.DataFrame(
-    pd.date_range(df_fuel_data['date']
-                  .min() - timedelta(days=1),
-				  df_fuel_data['date'].max()
-				 ),columns=['date']
-)
-
-# Create a cross join of unique station-fuel combinations with the date range
-# Sort the DataFrame ready for forward fill
-date_station_fuel_expanded = (
-	union_data
-	.merge(date_range_df, how='cross')
-	.sort_values(by=['servicestationname','address','fuelcode','date'])
-)
-
-# Calculate the median price per day for each station and fuel type
-daily_median_prices = (
-	df_fuel_data
-	.groupby(['servicestationname','address','fuelcode','date'])['price']
-	.median()
-	.reset_index()
+    pd.date_range(seed_date, end_date),
+    columns=['date']
 )
 
 # ----------------------------------------------------------------------------------------------------
 #                                           Block Four - pt1
-# - Fetch price data from last month
-# - Every station Left join median prices 
-# - Every station Left join last_day_of_last_month prices 
-# - Create PriceUpdatedDate column date where Price is not Null
+# - Seed price data from last month snapshot (fact table if no snapshot exists)
 # ----------------------------------------------------------------------------------------------------
 
-# Calculate the last day of the previous month
-date = df_fuel_data['date'].min()
-last_day = last_day_of_previous_month(date)
-
-# SQL query to fetch fuel price data from last month
-price_query = f"""
-SELECT 
-	name,
-	address,
-	fuelcode,
-	price,
-	date
-FROM
-	public.fact_fuel_prices
-	INNER JOIN dim_fuel_stations 
-	ON dim_fuel_stations.stationid = fact_fuel_prices.stationid
-WHERE
-	date = '{last_day}'
-"""
-
-# Execute the query
-last_month_price_data = pd.read_sql(price_query, engine)
-
-# Convert 'date' to datetime
-last_month_price_data['date'] = pd.to_datetime(last_month_price_data['date'])
-
-semijoined_data = (
-	date_station_fuel_expanded
-	.merge(
-		daily_median_prices,
-		left_on=['servicestationname', 'address', 'fuelcode', 'date'],
-		right_on=['servicestationname', 'address', 'fuelcode', 'date'],
-		how='left')
-)
-
-joined_data = (
-	semijoined_data
-	.merge(
-		last_month_price_data,
-		left_on=['servicestationname', 'address', 'fuelcode', 'date'],
-		right_on=['name', 'address', 'fuelcode', 'date'],
-           how='left')
-)
-
-# Ensure price columns are numeric before combining
-joined_data['price_x'] = joined_data['price_x'].astype(float)
-joined_data['price_y'] = joined_data['price_y'].astype(float)
+# Resume from the saved seed prices of a failed run with the same inputs
+last_month_price_data = load_checkpoint("block_four_pt1")
+seed_checkpointed = last_month_price_data is not None
+
+if seed_checkpointed:
+    logger.info(f"Seed prices for {last_day} restored from checkpoint")
+
+elif price_snapshot is not None:
+    # Seed from the snapshot closing prices
+    last_month_price_data = (
+        price_snapshot
+        .rename(columns={'servicestationname': 'name'})
+        [['name', 'address', 'fuelcode', 'price']]
+        .assign(date=pd.Timestamp(last_day))
+    )
+
+elif not source.seed_from_fact_tables:
+    # The fact tables only hold NSW prices, so other sources start unseeded
+    last_month_price_data = pd.DataFrame({
+        'name': pd.Series(dtype=object),
+        'address': pd.Series(dtype=object),
+        'fuelcode': pd.Series(dtype=object),
+        'price': pd.Series(dtype=float),
+        'date': pd.Series(dtype='datetime64[ns]'),
+    })
+
+else:
+    # SQL query to fetch fuel price data from last month
+    price_query = f"""
+    SELECT 
+        name,
+        address,
+        fuelcode,
+        price,
+        date
+    FROM
+        public.fact_fuel_prices
+        INNER JOIN dim_fuel_stations 
+        ON dim_fuel_stations.stationid = fact_fuel_prices.stationid
+    WHERE
+        date = '{last_day}'
+    """
 
-# Combine prices into one column
-joined_data['price'] = joined_data['price_x'].fillna(joined_data['price_y'])
+    # Execute the query
+    last_month_price_data = pd.read_sql(price_query, engine)
 
-# Drop redundant price columns if desired
-joined_data = joined_data.drop(columns=['price_x', 'price_y'])
+    # Convert 'date' to datetime
+    last_month_price_data['date'] = pd.to_datetime(last_month_price_data['date'])
 
-# set PriceUpdatedDate to date where Price is not Null
-joined_data['priceupdateddate']= joined_data['date'].where(~joined_data['price'].isna(), pd.NaT)
+if not seed_checkpointed:
+    save_checkpoint(last_month_price_data, "block_four_pt1")
 
 # ----------------------------------------------------------------------------------------------------
 #                                           Block Four - pt2
-# - Forward fill all prices
-# - Remove null prices
-# - Remove last month data
-# - Add unique id to each row
+# - Run Block Three & Four transformations per station shard
+# - Combine shard outputs
 # ----------------------------------------------------------------------------------------------------
 
-# Forward fill 'Price' within each 'servicestationname', 'address', 'fuelcode' group
-joined_data['price'] = joined_data.groupby(['servicestationname', 'address', 'fuelcode'])['price'].ffill()
+block_start = time.perf_counter()
 
-# Remove null price
-drop_nulls = joined_data.dropna(subset = ['price']).reset_index(drop=True)
+# Number of station shards (1 = single process)
+transform_shards = int(config.get("transform_shards", 1))
 
-# Remove last month
-max_date = joined_data['date'].max()
-output = drop_nulls[(drop_nulls['date'].dt.year == max_date.year) & (drop_nulls['date'].dt.month == max_date.month)].copy()
+if transform_backend == "duckdb":
+    try:
+        import duckdb
+    except ImportError:
+        logger.warning("duckdb is not installed - using the pandas transform")
+        transform_backend = "pandas"
+
+# Resume from the saved output of a failed run with the same inputs
+output = load_checkpoint("block_four_pt2")
+output_checkpointed = output is not None
+
+if output_checkpointed:
+    logger.info("Transformation output restored from checkpoint")
+
+elif transform_backend == "duckdb":
+    logger.info("Running transformation with DuckDB")
+    output = transform_station_fuel_duckdb(df_fuel_data, union_data, last_month_price_data, date_range_df)
+
+    # Compare against the pandas path and keep the pandas output if they disagree
+    if verify_backend:
+        pandas_output = transform_station_fuel(df_fuel_data, union_data, last_month_price_data, date_range_df)
+        if generate_output_hash(output) == generate_output_hash(pandas_output):
+            logger.info("DuckDB output matches the pandas output")
+        else:
+            only_duckdb = len(set(output['record_id']) - set(pandas_output['record_id']))
+            only_pandas = len(set(pandas_output['record_id']) - set(output['record_id']))
+            logger.error(
+                f"DuckDB output differs from the pandas output ({only_duckdb} record_ids only in DuckDB, "
+                f"{only_pandas} only in pandas) - using the pandas output"
+            )
+            output = pandas_output
+
+elif transform_shards <= 1:
+    output = transform_station_fuel(df_fuel_data, union_data, last_month_price_data, date_range_df)
+
+else:
+    logger.info(f"Running transformation across {transform_shards} station shards")
+
+    # Partition every input by the same station hash so each shard holds complete station histories
+    fuel_data_shards = station_shard(df_fuel_data, 'servicestationname', transform_shards)
+    union_shards = station_shard(union_data, 'servicestationname', transform_shards)
+    price_shards = station_shard(last_month_price_data, 'name', transform_shards)
+
+    # Each worker gets its shard's inputs explicitly, saved in its own folder
+    shard_root = os.path.join(checkpoint_folder, "shards")
+    shard_folders = [os.path.join(shard_root, str(shard)) for shard in range(transform_shards)]
+    for shard, folder in enumerate(shard_folders):
+        save_shard_inputs(
+            folder,
+            df_fuel_data[fuel_data_shards == shard],
+            union_data[union_shards == shard],
+            last_month_price_data[price_shards == shard],
+            date_range_df
+        )
 
-# Generate deterministic record_id for each fuel price observation
-# Step 1: Select key columns and concatenate them into a single string
-concat_cols = (
-    output[['servicestationname','address','fuelcode','price','date']]  # key columns
-    .astype(str)  # ensure consistent string representation before hashing
-    .agg('|'.join, axis=1)  # combine columns row-wise using a stable delimiter
-)
-# Step 2: Apply hash function to each concatenated row to create record_id
-output['record_id'] = concat_cols.map(generate_md5_hash)
+    with ThreadPoolExecutor(max_workers=min(transform_shards, os.cpu_count() or 1)) as executor:
+        shard_outputs = []
+        for shard_output in executor.map(transform_shard, shard_folders):
+            shard_outputs.append(shard_output)
+            rate_limited_debug(
+                logger,
+                "transform_shards",
+                f"{len(shard_outputs)} of {transform_shards} shards transformed",
+                rows=len(shard_output)
+            )
 
-#order & rename the final output columns
-output = output[['record_id', 'servicestationname', 'address', 'fuelcode', 'date', 'price', 'priceupdateddate']]
+    shutil.rmtree(shard_root, ignore_errors=True)
+
+    output = (
+        pd.concat(shard_outputs)
+        .sort_values(by=['servicestationname', 'address', 'fuelcode', 'date'])
+        .reset_index(drop=True)
+    )
+
+if not output_checkpointed:
+    save_checkpoint(output, "block_four_pt2")
 
 rowcount = len(output)
 logger.info(f"Final output has {rowcount} rows")
+log_block(logger, "Block Four - transform", block_start, rows=rowcount)
+
+# ----------------------------------------------------------------------------------------------------
+#                                           Block Four - validation
+# - Validate the output before loading it
+# - Reject the month if any check fails
+# ----------------------------------------------------------------------------------------------------
+
+block_start = time.perf_counter()
+validation_report = validate_output(output, end_date, validation_rules)
+save_validation_report(validation_report, target_file)
+
+for check, result in validation_report["checks"].items():
+    logger.info(f"Validation {check}: {result['failed_rows']} rows failed")
+
+if validation_report["rejected"]:
+    logger.error(f"{target_file} output rejected before load - failed checks: {', '.join(validation_report['rejected'])}")
+    sys.exit(1)
+
+log_block(logger, "Block Four - validation", block_start, rows=rowcount)
 # ----------------------------------------------------------------------------------------------------
 #                                           Block Four - pt3
 # - Insert into database
 # ----------------------------------------------------------------------------------------------------
 
-# Insert into database
-try:
-	logger.info(f"Inserting values into database")
-	output.to_sql('stg_fuel_price', engine, if_exists='append', index=False)
+block_start = time.perf_counter()
+
+# Skip the load if the whole month produced exactly the output already loaded
+manifest = load_manifest()
+manifest_entry = manifest.setdefault(target_file, {})
+output_sha256 = generate_output_hash(output)
+unchanged_output = transform_mode == "monthly" and manifest_entry.get("output_sha256") == output_sha256
+loaded = False
 
-except Exception as e:
-    logger.exception(f"Unexpected error while inserting values into database: {e}")
+if unchanged_output:
+    logger.info(f"{target_file} output is identical to the data already loaded - skipping load")
+
+else:
+    # Insert into database (replacing the month's staged rows when reprocessing a revised file)
+    try:
+        with engine.begin() as connection:
+            if output_mode == "intervals":
+                intervals = price_intervals(output)
+                logger.info(f"{rowcount} daily rows collapsed to {len(intervals)} price intervals")
+                prepare_interval_tables(connection, source.table_suffix)
+
+                # Replace anything already staged for these days, then continue intervals open the day before
+                logger.info(f"Removing staged intervals between {output['date'].min().date()} and {output['date'].max().date()}")
+                clear_staged_range(connection, output['date'].min(), output['date'].max(), source.table_suffix)
+                intervals = extend_open_intervals(connection, intervals, source.table_suffix)
+
+                logger.info(f"Inserting intervals into database")
+                intervals.to_sql(interval_table, connection, if_exists='append', index=False)
+                loaded_rows = len(intervals)
+
+            else:
+                # Replace anything already staged for these days (reprocessed months and reruns over loaded days)
+                daily_table = staging_table
+                logger.info(f"Removing staged rows between {output['date'].min().date()} and {output['date'].max().date()}")
+                if staging_table in inspect(connection).get_view_names(schema="public"):
+                    # Intervals mode has run, so stg_fuel_price is its view - daily rows go to the view's dense table
+                    daily_table = dense_table
+                    clear_staged_range(connection, output['date'].min(), output['date'].max(), source.table_suffix)
+                elif inspect(connection).has_table(staging_table):
+                    connection.execute(
+                        text(f"DELETE FROM public.{staging_table} WHERE date BETWEEN :start_date AND :end_date"),
+                        {"start_date": output['date'].min().date(), "end_date": output['date'].max().date()}
+                    )
+                logger.info(f"Inserting values into {daily_table}")
+                output.to_sql(daily_table, connection, if_exists='append', index=False)
+                loaded_rows = rowcount
+        loaded = True
+        log_block(logger, "Block Four - load", block_start, rows=loaded_rows)
+
+    except Exception as e:
+        logger.exception(f"Unexpected error while inserting values into database: {e}")
+
+        # Keep the checkpoints and config unchanged so the retry resumes at the load
+        logger.error(f"{target_file} load failed - rerun to resume from checkpoint {checkpoint_folder}")
+        sys.exit(1)
+
+# Record the output hash of whole-month loads
+if loaded and transform_mode == "monthly":
+    manifest_entry["output_sha256"] = output_sha256
+    save_manifest(manifest)
+
+# ----------------------------------------------------------------------------------------------------
+#                                           Block Four - pt4
+# - Save closing price snapshot to seed the next run
+# - Write the daily prices to the local price history store
+# ----------------------------------------------------------------------------------------------------
+
+save_station_matches()
+
+if not unchanged_output:
+    closing_snapshot = build_price_snapshot(output, price_snapshot)
+    save_price_snapshot(closing_snapshot, end_date.date())
+
+    # Daily runs add their days to the stored month, monthly runs replace it
+    # (the store is a local cache rebuilt from the monthly files, so it is not pushed)
+    try:
+        write_price_history(output, merge=transform_mode == "daily", folder=price_history_folder)
+    except Exception as e:
+        logger.exception(f"Unexpected error writing price history: {e}")
 
 #update the config 
-config["last_transformation"] = config["latest_file"]
+if reprocessing:
+    reprocess_months.remove(target_file)
+    config["reprocess_months"] = reprocess_months
+
+    # Modules 4-6 only revisit the month when the load replaced its staged rows
+    if loaded:
+        for queue in ["rollup_months", "anomaly_months", "data_quality_months"]:
+            queued_months = config.setdefault(queue, [])
+            if target_file not in queued_months:
+                queued_months.append(target_file)
+    else:
+        logger.info(f"{target_file} staged rows unchanged - not queued for data quality, rollups or anomaly checks")
+
+    if target_file != latest_file:
+        logger.warning(f"Months after {target_file} were seeded from its previous version and are not reprocessed")
+
+else:
+    # Only move the cursor forward - a rerun over earlier days must not send later days round again
+    last_transformed_date = config.get("last_transformed_date")
+    if last_transformed_date is None or end_date > pd.Timestamp(last_transformed_date):
+        config["last_transformed_date"] = end_date.strftime("%Y-%m-%d")
+
+    # In daily mode the file only counts as transformed once its last day is processed
+    target_file_end = pd.Timestamp(target_file_dt) + pd.offsets.MonthEnd(0)
+    if transform_mode == "monthly" or end_date >= target_file_end:
+        config["last_transformation"] = config["latest_file"]
 save_config()
 
+# The month is loaded, so its checkpoints are no longer needed
+clear_checkpoints(target_file)
+
 logger.info("Operation complete")
@@ -1,18 +1,15 @@
 # Import packages
 # Import necessary libraries
 from datetime import datetime, timedelta, timezone
-from sqlalchemy import create_engine, text
 import argparse
 import json
-import logging
-import numpy as np
 import os
-import pandas as pd
-import requests
 import subprocess
 import sys
 import uuid
 
+from pipeline_logging import setup_module_logging
+
 # ----------------------------------------------------------------------------------------------------
 #                                       setup variables
 # ----------------------------------------------------------------------------------------------------
@@ -20,28 +17,19 @@ import uuid
 # Get log file path from orchestrator
 parser = argparse.ArgumentParser()
 parser.add_argument("--log-file", required=True)
+parser.add_argument("--log-port", type=int, help="port of the orchestrator log server")
+parser.add_argument("--log-level", default="INFO")
 args = parser.parse_args()
 log_file = args.log_file
 
 os.makedirs("data and logs", exist_ok=True)
 
-# Set up logging for module
-logging.basicConfig(
-    filename=log_file,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s -      Module 3    - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
-
-# Create logger with dummy name so it can be scaled later if needed
-logger = logging.getLogger("log_dog")
+# Set up logging for module (records are queued and sent to the orchestrator's log writer)
+logger = setup_module_logging(log_file, args.log_port, "Module 3", args.log_level)
 
 # Load environment variables from GitHub Secrets
 DB_CONNECTION_STRING = os.getenv("DB_CONNECTION_STRING")
 
-# Create database engine
-engine = create_engine(DB_CONNECTION_STRING)
-
 # Set up the file config
 config_file = "config.json"
 with open("config.json") as json_file:
@@ -206,6 +194,17 @@ if config["latest_file"] == config["last_API_call_update"]:
     logger.info(f"{config['latest_file']} station dictionary already up to date")
     sys.exit(10)
 
+# Heavy imports and database engine are only needed once the module has work to do
+from sqlalchemy import create_engine, text
+import numpy as np
+import pandas as pd
+import requests
+
+from station_matching import parse_address
+
+# Create database engine
+engine = create_engine(DB_CONNECTION_STRING)
+
 # -------------------------------------------------------------------------------------------------
 #                                       Pull API Information
 # -------------------------------------------------------------------------------------------------
@@ -225,12 +224,8 @@ if data is None:
     sys.exit(1)
     
 logger.info(f"Cleaning API Data")
-# Create the new address columns using 
-data['street'] = data['address'].str.extract(r'((?:\d+|Corner|Cnr).+?),')
-data['street'] = data['street'].str.title()
-data['town'] = data['address'].str.extract(r',\s(\D+)\sNSW\s\d+')
-data['town'] = data['town'].str.title() 
-data['postcode'] = data['address'].str.extract(r'NSW\s(\d+)')
+# Create the new address columns (the same parsing module 2 uses to match CSV stations)
+data[['street', 'town', 'postcode']] = parse_address(data['address'])
 data['address'] = data['address'].str.strip()
 data['name'] = data['name'].str.strip()
 
@@ -304,6 +299,9 @@ except Exception as e:
     logger.exception(f"Unexpected error while inserting values into database: {e}")
 
 #update the config 
+# Record when stations changed so the station locator index is rebuilt
+if not (deleted.empty and new.empty and updated_stations.empty):
+    config["last_station_change"] = datetimestamp
 config["last_API_call"] = datetimestamp
 config["last_API_call_update"] = config["latest_file"]
 save_config()
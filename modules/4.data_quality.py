@@ -1,10 +1,13 @@
 # Import packages
 # Import necessary libraries
-from sqlalchemy import create_engine, text
+from datetime import datetime
 import argparse
-import logging
+import json
 import os
 import subprocess
+import sys
+
+from pipeline_logging import setup_module_logging
 
 # ----------------------------------------------------------------------------------------------------
 #                                       setup variables
@@ -13,33 +16,108 @@ import subprocess
 # Get log file path from orchestrator
 parser = argparse.ArgumentParser()
 parser.add_argument("--log-file", required=True)
+parser.add_argument("--log-port", type=int, help="port of the orchestrator log server")
+parser.add_argument("--log-level", default="INFO")
 args = parser.parse_args()
 log_file = args.log_file
 
 os.makedirs("data and logs", exist_ok=True)
 
-# Set up logging for module
-logging.basicConfig(
-    filename=log_file,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s -      Module 4    - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
-
-# Create logger with dummy name so it can be scaled later if needed
-logger = logging.getLogger("log_dog")
+# Set up logging for module (records are queued and sent to the orchestrator's log writer)
+logger = setup_module_logging(log_file, args.log_port, "Module 4", args.log_level)
 
 # Load environment variables from GitHub Secrets
 DB_CONNECTION_STRING = os.getenv("DB_CONNECTION_STRING")
 
-# Create database engine
-engine = create_engine(DB_CONNECTION_STRING)
+# Set up the file config
+config_file = "config.json"
+with open("config.json") as json_file:
+    config = json.load(json_file)
+
+# Staging data state the data quality check runs against
+staging_state = [config.get("last_transformed_date"), config.get("last_API_call")]
 
+# Reprocessed months whose staged rows were replaced since the last check
+data_quality_months = config.get("data_quality_months", [])
+
+# timestamp for commits
+datetimestamp = datetime.now().strftime("%Y%m%d_%Hh%M")
+
+# ----------------------------------------------------------------------------------------------------
+#                                       setup functions
+# ----------------------------------------------------------------------------------------------------
+
+def push_file_to_repo(file_path, commit_message):
+    """
+    Add, commit, and push a file to a GitHub repository using a GitHub token.
+
+    Args:
+        file_path (str): Path to the file to push.
+        commit_message (str): Commit message for the Git change.
+
+    Raises:
+        subprocess.CalledProcessError: If any git command fails (except when commit has no changes).
+    """
+    logger.info("pushing file to repo")
+    try:
+        repo_url = (
+            f"https://x-access-token:{os.environ['GITHUB_TOKEN']}"
+            f"@github.com/{os.environ['GITHUB_REPOSITORY']}.git"
+        )
+
+        subprocess.run(["git", "config", "user.name", "github-actions"], check=True)
+        subprocess.run(["git", "config", "user.email", "github-actions@github.com"], check=True)
+        subprocess.run(["git", "add", file_path], check=True)
+        subprocess.run(
+            ["git", "commit", "-m", commit_message],
+            check=False  # won't fail if nothing changed
+        )
+        subprocess.run(["git", "push", repo_url, "HEAD:main"], check=True)
+
+        logger.info(f"Successfully pushed {file_path} to repo")
+
+    except subprocess.CalledProcessError as e:
+        logger.exception(f"Failed to push {file_path}: {e}")
+        raise
+
+
+def save_config():
+    """
+    Save the current configuration to a JSON file and push it to GitHub.
+
+    Writes the global `config` object to 'config.json' with indentation,
+    then pushes the file to the repository with a timestamped commit message.
+
+    Raises:
+        Exception: If writing the file or pushing to GitHub fails.
+    """
+    try:
+        with open("config.json", "w") as json_file:
+            json.dump(config, json_file, indent=4)
+        logger.info("Config file updated")
+        push_file_to_repo(config_file, f"successful run - configfile updated {datetimestamp}")
+
+    except Exception as e:
+        logger.exception(f"Unexpected error saving json config file: {e}")
 
 # ----------------------------------------------------------------------------------------------------
 #                                     Script Body - Start
 # ----------------------------------------------------------------------------------------------------
 
+# exit if no new staging data has been loaded or reprocessed since the last check
+if config.get("last_data_quality") == staging_state and not data_quality_months:
+    logger.info("No new staging data since the last data quality check")
+    sys.exit(10)
+
+if data_quality_months:
+    logger.info(f"Rechecking reprocessed months: {', '.join(data_quality_months)}")
+
+# Heavy imports and database engine are only needed once the module has work to do
+from sqlalchemy import create_engine, text
+
+# Create database engine
+engine = create_engine(DB_CONNECTION_STRING)
+
 logger.info("Running SQL Stored Procedure")
 
 call = text("CALL check_data_quality();")
@@ -47,4 +125,9 @@ with engine.connect() as conn:
     conn = conn.execution_options(isolation_level="AUTOCOMMIT")
     conn.execute(call)
 
+#update the config
+config["last_data_quality"] = staging_state
+config["data_quality_months"] = []
+save_config()
+
 logger.info("Operation complete")
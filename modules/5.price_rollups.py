@@ -0,0 +1,260 @@
+# Import necessary libraries
+from datetime import datetime, timedelta
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from pipeline_logging import setup_module_logging
+
+# ----------------------------------------------------------------------------------------------------
+#                                       setup variables
+# ----------------------------------------------------------------------------------------------------
+
+# Get log file path from orchestrator
+parser = argparse.ArgumentParser()
+parser.add_argument("--log-file", required=True)
+parser.add_argument("--log-port", type=int, help="port of the orchestrator log server")
+parser.add_argument("--log-level", default="INFO")
+args = parser.parse_args()
+log_file = args.log_file
+
+os.makedirs("data and logs", exist_ok=True)
+
+# Set up logging for module (records are queued and sent to the orchestrator's log writer)
+logger = setup_module_logging(log_file, args.log_port, "Module 5", args.log_level)
+
+# Load environment variables from GitHub Secrets
+DB_CONNECTION_STRING = os.getenv("DB_CONNECTION_STRING")
+
+# Set up the file config
+config_file = "config.json"
+with open("config.json") as json_file:
+    config = json.load(json_file)
+
+# Last day loaded by the transform and last day rolled up
+last_transformed_date = config.get("last_transformed_date")
+last_rollup = config.get("last_rollup")
+
+# Reprocessed months whose rollups need rebuilding
+rollup_months = config.get("rollup_months", [])
+
+# Station attributes each rollup is grouped by
+rollup_levels = ['town', 'postcode', 'brand']
+
+# timestamp for commits
+datetimestamp = datetime.now().strftime("%Y%m%d_%Hh%M")
+
+# ----------------------------------------------------------------------------------------------------
+#                                       setup functions
+# ----------------------------------------------------------------------------------------------------
+
+def push_file_to_repo(file_path, commit_message):
+    """
+    Add, commit, and push a file to a GitHub repository using a GitHub token.
+
+    Args:
+        file_path (str): Path to the file to push.
+        commit_message (str): Commit message for the Git change.
+
+    Raises:
+        subprocess.CalledProcessError: If any git command fails (except when commit has no changes).
+    """
+    logger.info("pushing file to repo")
+    try:
+        repo_url = (
+            f"https://x-access-token:{os.environ['GITHUB_TOKEN']}"
+            f"@github.com/{os.environ['GITHUB_REPOSITORY']}.git"
+        )
+
+        subprocess.run(["git", "config", "user.name", "github-actions"], check=True)
+        subprocess.run(["git", "config", "user.email", "github-actions@github.com"], check=True)
+        subprocess.run(["git", "add", file_path], check=True)
+        subprocess.run(
+            ["git", "commit", "-m", commit_message],
+            check=False  # won't fail if nothing changed
+        )
+        subprocess.run(["git", "push", repo_url, "HEAD:main"], check=True)
+
+        logger.info(f"Successfully pushed {file_path} to repo")
+
+    except subprocess.CalledProcessError as e:
+        logger.exception(f"Failed to push {file_path}: {e}")
+        raise
+
+
+def save_config():
+    """
+    Save the current configuration to a JSON file and push it to GitHub.
+
+    Writes the global `config` object to 'config.json' with indentation,
+    then pushes the file to the repository with a timestamped commit message.
+
+    Raises:
+        Exception: If writing the file or pushing to GitHub fails.
+    """
+    try:
+        with open("config.json", "w") as json_file:
+            json.dump(config, json_file, indent=4)
+        logger.info("Config file updated")
+        push_file_to_repo(config_file, f"successful run - configfile updated {datetimestamp}")
+
+    except Exception as e:
+        logger.exception(f"Unexpected error saving json config file: {e}")
+
+
+def price_rollup(prices, period_column):
+    """
+    Aggregate prices per period and fuelcode for every rollup level.
+
+    Args:
+        prices (pd.DataFrame): Daily station prices with town, postcode and brand columns.
+        period_column (str): Column holding the rollup period ('date' or 'month').
+
+    Returns:
+        pd.DataFrame: One row per period, fuelcode, level and level value with the
+        average, minimum, maximum and median price and the number of stations.
+    """
+    rollups = []
+    for level in rollup_levels:
+        rollup = (
+            prices
+            .groupby([period_column, 'fuelcode', level])
+            .agg(
+                avg_price=('price', 'mean'),
+                min_price=('price', 'min'),
+                max_price=('price', 'max'),
+                median_price=('price', 'median'),
+                station_count=('stationkey', 'nunique')
+            )
+            .reset_index()
+            .rename(columns={level: 'level_value'})
+        )
+        rollup.insert(2, 'level', level)
+        rollups.append(rollup)
+
+    return pd.concat(rollups, ignore_index=True)
+
+
+def replace_rollup(rollup, table, period_column, start, end):
+    """
+    Replace the rows of a rollup table for a period range with new aggregates.
+
+    Args:
+        rollup (pd.DataFrame): Aggregates created by `price_rollup`.
+        table (str): Rollup table name.
+        period_column (str): Period column of the table ('date' or 'month').
+        start (datetime.date): First period to replace.
+        end (datetime.date): Last period to replace.
+    """
+    with engine.begin() as connection:
+        if inspect(connection).has_table(table):
+            connection.execute(
+                text(f"DELETE FROM public.{table} WHERE {period_column} BETWEEN :start AND :end"),
+                {"start": start, "end": end}
+            )
+        rollup.to_sql(table, connection, if_exists='append', index=False)
+    logger.info(f"{table} updated with {len(rollup)} rows from {start} to {end}")
+
+# ----------------------------------------------------------------------------------------------------
+#                                     Script Body - Start
+# ----------------------------------------------------------------------------------------------------
+
+# exit if every loaded day has already been rolled up
+if last_rollup == last_transformed_date and not rollup_months:
+    logger.info(f"Rollups already up to date to {last_transformed_date}")
+    sys.exit(10)
+
+# Heavy imports and database engine are only needed once the module has work to do
+from sqlalchemy import create_engine, inspect, text
+import pandas as pd
+
+# Create database engine
+engine = create_engine(DB_CONNECTION_STRING)
+
+# ----------------------------------------------------------------------------------------------------
+#                                           Block One
+# - Set the new days and the months they fall in
+# - Fetch staged prices with station town, postcode and brand
+# ----------------------------------------------------------------------------------------------------
+
+# New days since the last rollup plus any reprocessed months
+end_date = pd.Timestamp(last_transformed_date)
+if last_rollup is not None and last_rollup != last_transformed_date:
+    start_date = pd.Timestamp(last_rollup) + timedelta(days=1)
+elif last_rollup is None:
+    start_date = end_date.replace(day=1)
+else:
+    start_date = None
+
+month_starts = {pd.Timestamp(datetime.strptime(month, "%b%Y")) for month in rollup_months}
+if start_date is not None:
+    month_starts.update(pd.date_range(start_date.replace(day=1), end_date, freq='MS'))
+month_starts = sorted(month_starts)
+
+# Monthly aggregates need every day of the month, so read from the first affected month
+read_start = month_starts[0]
+read_end = max(end_date, month_starts[-1] + pd.offsets.MonthEnd(0))
+logger.info(f"Reading staged prices from {read_start.date()} to {read_end.date()}")
+
+# SQL query to fetch staged prices with station attributes
+price_query = text(f"""
+SELECT
+    staged.servicestationname || '|' || staged.address AS stationkey,
+    staged.fuelcode,
+    staged.date,
+    staged.price,
+    dim_fuel_stations.town,
+    dim_fuel_stations.postcode,
+    dim_fuel_stations.brand
+FROM
+    public.stg_fuel_price AS staged
+    INNER JOIN (
+        -- One row per name and address: a re-added station keeps its old inactive row
+        SELECT DISTINCT ON (name, address) name, address, town, postcode, brand
+        FROM dim_fuel_stations
+        ORDER BY name, address, active DESC
+    ) AS dim_fuel_stations
+        ON dim_fuel_stations.name = staged.servicestationname
+        AND dim_fuel_stations.address = staged.address
+WHERE
+    staged.date BETWEEN :read_start AND :read_end
+""")
+
+# Execute the query
+prices = pd.read_sql(price_query, engine, params={"read_start": read_start.date(), "read_end": read_end.date()})
+prices['date'] = pd.to_datetime(prices['date'])
+prices['month'] = prices['date'].dt.to_period('M').dt.to_timestamp()
+
+rowcount = len(prices)
+logger.info(f"prices has {rowcount} rows")
+
+# ----------------------------------------------------------------------------------------------------
+#                                           Block Two
+# - Daily rollups for the new days
+# - Monthly rollups for the affected months
+# ----------------------------------------------------------------------------------------------------
+
+if start_date is not None:
+    new_days = prices[prices['date'].between(start_date, end_date)]
+    daily_rollup = price_rollup(new_days, 'date')
+    replace_rollup(daily_rollup, 'agg_daily_fuel_price', 'date', start_date.date(), end_date.date())
+
+for month_start in month_starts:
+    month_prices = prices[prices['month'] == month_start]
+    monthly_rollup = price_rollup(month_prices, 'month')
+    replace_rollup(monthly_rollup, 'agg_monthly_fuel_price', 'month', month_start.date(), month_start.date())
+
+    # Reprocessed months also need their daily rollups rebuilt
+    if month_start.strftime("%b%Y").lower() in rollup_months:
+        month_end = month_start + pd.offsets.MonthEnd(0)
+        daily_rollup = price_rollup(month_prices, 'date')
+        replace_rollup(daily_rollup, 'agg_daily_fuel_price', 'date', month_start.date(), month_end.date())
+
+#update the config
+config["last_rollup"] = last_transformed_date
+config["rollup_months"] = []
+save_config()
+
+logger.info("Operation complete")
@@ -0,0 +1,329 @@
+# Import necessary libraries
+from datetime import datetime, timedelta
+import argparse
+import json
+import os
+import subprocess
+import sys
+import warnings
+
+from pipeline_logging import setup_module_logging
+
+# ----------------------------------------------------------------------------------------------------
+#                                       setup variables
+# ----------------------------------------------------------------------------------------------------
+
+# Get log file path from orchestrator
+parser = argparse.ArgumentParser()
+parser.add_argument("--log-file", required=True)
+parser.add_argument("--log-port", type=int, help="port of the orchestrator log server")
+parser.add_argument("--log-level", default="INFO")
+args = parser.parse_args()
+log_file = args.log_file
+
+os.makedirs("data and logs", exist_ok=True)
+
+# Set up logging for module (records are queued and sent to the orchestrator's log writer)
+logger = setup_module_logging(log_file, args.log_port, "Module 6", args.log_level)
+
+# Load environment variables from GitHub Secrets
+DB_CONNECTION_STRING = os.getenv("DB_CONNECTION_STRING")
+
+# Set up the file config
+config_file = "config.json"
+with open("config.json") as json_file:
+    config = json.load(json_file)
+
+# Last day loaded by the transform and last day checked for anomalies
+last_transformed_date = config.get("last_transformed_date")
+last_anomaly_check = config.get("last_anomaly_check")
+
+# Reprocessed months whose anomalies need rechecking
+anomaly_months = config.get("anomaly_months", [])
+
+# Outlier thresholds
+anomaly_rules = {
+    "z_threshold": 3.5,
+    "min_mad": 1.0,
+    "min_stations": 10,
+    "rolling_window": 7,
+    "max_rolling_deviation": 0.15,
+    "max_daily_change": 0.2,
+    **config.get("anomaly_rules", {})
+}
+
+# Groups the cross-station statistics are calculated over (None = all NSW stations)
+anomaly_levels = [None, 'town', 'postcode']
+
+# Station-fuel key columns
+key_columns = ['servicestationname', 'address', 'fuelcode']
+
+# timestamp for commits
+datetimestamp = datetime.now().strftime("%Y%m%d_%Hh%M")
+
+# ----------------------------------------------------------------------------------------------------
+#                                       setup functions
+# ----------------------------------------------------------------------------------------------------
+
+def push_file_to_repo(file_path, commit_message):
+    """
+    Add, commit, and push a file to a GitHub repository using a GitHub token.
+
+    Args:
+        file_path (str): Path to the file to push.
+        commit_message (str): Commit message for the Git change.
+
+    Raises:
+        subprocess.CalledProcessError: If any git command fails (except when commit has no changes).
+    """
+    logger.info("pushing file to repo")
+    try:
+        repo_url = (
+            f"https://x-access-token:{os.environ['GITHUB_TOKEN']}"
+            f"@github.com/{os.environ['GITHUB_REPOSITORY']}.git"
+        )
+
+        subprocess.run(["git", "config", "user.name", "github-actions"], check=True)
+        subprocess.run(["git", "config", "user.email", "github-actions@github.com"], check=True)
+        subprocess.run(["git", "add", file_path], check=True)
+        subprocess.run(
+            ["git", "commit", "-m", commit_message],
+            check=False  # won't fail if nothing changed
+        )
+        subprocess.run(["git", "push", repo_url, "HEAD:main"], check=True)
+
+        logger.info(f"Successfully pushed {file_path} to repo")
+
+    except subprocess.CalledProcessError as e:
+        logger.exception(f"Failed to push {file_path}: {e}")
+        raise
+
+
+def save_config():
+    """
+    Save the current configuration to a JSON file and push it to GitHub.
+
+    Writes the global `config` object to 'config.json' with indentation,
+    then pushes the file to the repository with a timestamped commit message.
+
+    Raises:
+        Exception: If writing the file or pushing to GitHub fails.
+    """
+    try:
+        with open("config.json", "w") as json_file:
+            json.dump(config, json_file, indent=4)
+        logger.info("Config file updated")
+        push_file_to_repo(config_file, f"successful run - configfile updated {datetimestamp}")
+
+    except Exception as e:
+        logger.exception(f"Unexpected error saving json config file: {e}")
+
+
+def robust_outliers(prices, level):
+    """
+    Flag prices far from the other stations selling the same fuel on the same day.
+
+    The robust z-score uses the median and median absolute deviation (MAD) of every
+    fuelcode, day and level value, calculated with grouped transforms over the whole
+    month at once. The MAD is floored at `min_mad` so groups where almost every station
+    has the same price do not flag one cent differences.
+
+    Args:
+        prices (pd.DataFrame): Daily station prices with town and postcode columns.
+        level (str | None): Station attribute to group by, or None for all stations.
+
+    Returns:
+        pd.DataFrame: Outlier rows with check, level_value, reference (group median) and score (robust z).
+    """
+    group_columns = ['fuelcode', 'date'] + ([level] if level else [])
+    groups = [prices[column] for column in group_columns]
+
+    median = prices.groupby(groups)['price'].transform('median')
+    deviation = prices['price'] - median
+    mad = deviation.abs().groupby(groups).transform('median')
+    station_count = prices.groupby(groups)['price'].transform('count')
+
+    score = 0.6745 * deviation / np.maximum(mad, anomaly_rules['min_mad'])
+    flagged = (score.abs() > anomaly_rules['z_threshold']) & (station_count >= anomaly_rules['min_stations'])
+
+    outliers = prices.loc[flagged, key_columns + ['date', 'price']].copy()
+    outliers['check'] = f"{level or 'nsw'}_robust_z"
+    outliers['level_value'] = prices.loc[flagged, level].astype(str) if level else 'NSW'
+    outliers['reference'] = median[flagged]
+    outliers['score'] = score[flagged]
+    return outliers
+
+
+def rolling_outliers(prices):
+    """
+    Flag day-over-day jumps and prices far from the station's own recent prices.
+
+    Prices are scattered into a station-fuel x day matrix so the daily change and the
+    rolling median of the previous `rolling_window` days are calculated for every
+    station at once.
+
+    Args:
+        prices (pd.DataFrame): Daily station prices.
+
+    Returns:
+        pd.DataFrame: Outlier rows with check, level_value, reference (previous price or
+        rolling median) and score (relative change).
+    """
+    window = int(anomaly_rules['rolling_window'])
+
+    # Price matrix: one row per station-fuel, one column per day
+    station_codes, stations = pd.factorize(pd.MultiIndex.from_frame(prices[key_columns]))
+    first_day = prices['date'].min()
+    day_codes = (prices['date'] - first_day).dt.days.to_numpy()
+    matrix = np.full((len(stations), day_codes.max() + 1), np.nan)
+    matrix[station_codes, day_codes] = prices['price'].to_numpy(dtype=float)
+
+    # Previous day price and median of the previous `window` days
+    padded = np.concatenate([np.full((len(stations), window), np.nan), matrix], axis=1)
+    previous_price = padded[:, window - 1:-1]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)  # stations with no earlier prices
+        rolling_median = np.nanmedian(np.lib.stride_tricks.sliding_window_view(padded[:, :-1], window, axis=1), axis=2)
+
+    checks = [
+        ("daily_change", previous_price, anomaly_rules['max_daily_change']),
+        ("rolling_deviation", rolling_median, anomaly_rules['max_rolling_deviation']),
+    ]
+
+    outliers = []
+    for check, reference_matrix, threshold in checks:
+        reference = reference_matrix[station_codes, day_codes]
+        change = prices['price'].to_numpy(dtype=float) / reference - 1
+        flagged = np.abs(change) > threshold
+
+        check_outliers = prices.loc[flagged, key_columns + ['date', 'price']].copy()
+        check_outliers['check'] = check
+        check_outliers['level_value'] = 'station'
+        check_outliers['reference'] = reference[flagged]
+        check_outliers['score'] = change[flagged]
+        outliers.append(check_outliers)
+
+    return pd.concat(outliers, ignore_index=True)
+
+
+def replace_anomalies(anomalies, start, end):
+    """
+    Replace the anomalies of a date range.
+
+    Args:
+        anomalies (pd.DataFrame): Anomalies found in the date range.
+        start (datetime.date): First day to replace.
+        end (datetime.date): Last day to replace.
+    """
+    with engine.begin() as connection:
+        if inspect(connection).has_table('fuel_price_anomalies'):
+            connection.execute(
+                text("DELETE FROM public.fuel_price_anomalies WHERE date BETWEEN :start AND :end"),
+                {"start": start, "end": end}
+            )
+        anomalies.to_sql('fuel_price_anomalies', connection, if_exists='append', index=False)
+    logger.info(f"fuel_price_anomalies updated with {len(anomalies)} rows from {start} to {end}")
+
+# ----------------------------------------------------------------------------------------------------
+#                                     Script Body - Start
+# ----------------------------------------------------------------------------------------------------
+
+# exit if every loaded day has already been checked
+if last_anomaly_check == last_transformed_date and not anomaly_months:
+    logger.info(f"Anomaly checks already up to date to {last_transformed_date}")
+    sys.exit(10)
+
+# Heavy imports and database engine are only needed once the module has work to do
+from sqlalchemy import create_engine, inspect, text
+import numpy as np
+import pandas as pd
+
+# Create database engine
+engine = create_engine(DB_CONNECTION_STRING)
+
+# ----------------------------------------------------------------------------------------------------
+#                                           Block One
+# - Set the days to check: new days since the last check plus reprocessed months
+# - Fetch staged prices with station town and postcode, including the rolling window before them
+# ----------------------------------------------------------------------------------------------------
+
+end_date = pd.Timestamp(last_transformed_date)
+check_ranges = []
+if last_anomaly_check is not None and last_anomaly_check != last_transformed_date:
+    check_ranges.append((pd.Timestamp(last_anomaly_check) + timedelta(days=1), end_date))
+elif last_anomaly_check is None:
+    check_ranges.append((end_date.replace(day=1), end_date))
+
+for month in anomaly_months:
+    month_start = pd.Timestamp(datetime.strptime(month, "%b%Y"))
+    check_ranges.append((month_start, month_start + pd.offsets.MonthEnd(0)))
+
+read_start = min(start for start, end in check_ranges) - timedelta(days=int(anomaly_rules['rolling_window']))
+read_end = max(end for start, end in check_ranges)
+logger.info(f"Reading staged prices from {read_start.date()} to {read_end.date()}")
+
+# SQL query to fetch staged prices with station attributes
+price_query = text(f"""
+SELECT
+    staged.servicestationname,
+    staged.address,
+    staged.fuelcode,
+    staged.date,
+    staged.price,
+    dim_fuel_stations.town,
+    dim_fuel_stations.postcode
+FROM
+    public.stg_fuel_price AS staged
+    LEFT JOIN (
+        -- One row per name and address: a re-added station keeps its old inactive row
+        SELECT DISTINCT ON (name, address) name, address, town, postcode
+        FROM dim_fuel_stations
+        ORDER BY name, address, active DESC
+    ) AS dim_fuel_stations
+        ON dim_fuel_stations.name = staged.servicestationname
+        AND dim_fuel_stations.address = staged.address
+WHERE
+    staged.date BETWEEN :read_start AND :read_end
+""")
+
+# Execute the query
+prices = pd.read_sql(price_query, engine, params={"read_start": read_start.date(), "read_end": read_end.date()})
+prices['date'] = pd.to_datetime(prices['date'])
+prices['price'] = prices['price'].astype(float)
+
+rowcount = len(prices)
+logger.info(f"prices has {rowcount} rows")
+
+# exit if nothing has been staged for the days to check
+if prices.empty:
+    logger.warning(f"No staged prices found between {read_start.date()} and {read_end.date()}")
+    sys.exit(10)
+
+# ----------------------------------------------------------------------------------------------------
+#                                           Block Two
+# - Cross-station robust z-scores per fuelcode and day (all NSW, town, postcode)
+# - Per-station daily changes and deviations from the rolling median
+# ----------------------------------------------------------------------------------------------------
+
+anomalies = pd.concat(
+    [robust_outliers(prices, level) for level in anomaly_levels] + [rolling_outliers(prices)],
+    ignore_index=True
+)
+anomalies['checked'] = datetimestamp
+logger.info(f"{len(anomalies)} anomalies found across {rowcount} prices")
+
+# ----------------------------------------------------------------------------------------------------
+#                                           Block Three
+# - Replace the anomalies of every checked range
+# ----------------------------------------------------------------------------------------------------
+
+for start, end in check_ranges:
+    in_range = anomalies['date'].between(start, end)
+    replace_anomalies(anomalies[in_range], start.date(), end.date())
+
+#update the config
+config["last_anomaly_check"] = last_transformed_date
+config["anomaly_months"] = []
+save_config()
+
+logger.info("Operation complete")
@@ -1,10 +1,11 @@
 from datetime import datetime, timedelta
 import argparse
 import glob
-import logging
 import os
 import subprocess
 
+from pipeline_logging import setup_module_logging
+
 # ----------------------------------------------------------------------------------------------------
 #                                       setup variables
 # ----------------------------------------------------------------------------------------------------
@@ -12,21 +13,15 @@ import subprocess
 # Get log file path from orchestrator
 parser = argparse.ArgumentParser()
 parser.add_argument("--log-file", required=True)
+parser.add_argument("--log-port", type=int, help="port of the orchestrator log server")
+parser.add_argument("--log-level", default="INFO")
 args = parser.parse_args()
 log_file = args.log_file
 
 os.makedirs("data and logs", exist_ok=True)
 
-# Set up logging for module
-logging.basicConfig(
-    filename=log_file,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - Retention Policy - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
-
-# Create logger with dummy name so it can be scaled later if needed
-logger = logging.getLogger("log_dog")
+# Set up logging for module (records are queued and sent to the orchestrator's log writer)
+logger = setup_module_logging(log_file, args.log_port, "Retention Policy", args.log_level)
 def cleanup_old_workflow_logs():
     """
     Deletes workflow log files older than 30 days and pushes changes to GitHub.
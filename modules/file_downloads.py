@@ -0,0 +1,158 @@
+# Import necessary libraries
+import asyncio
+import logging
+
+import aiohttp
+
+# ----------------------------------------------------------------------------------------------------
+#                                       setup variables
+# ----------------------------------------------------------------------------------------------------
+
+# Create logger with dummy name so it can be scaled later if needed
+logger = logging.getLogger("log_dog")
+
+# ----------------------------------------------------------------------------------------------------
+#                                       Defining functions
+# ----------------------------------------------------------------------------------------------------
+
+def rank_links(probed_links):
+    """
+    Order candidate links so CSV files come first, then the smallest reachable file.
+
+    Args:
+        probed_links (list[tuple[str, int | None]]): Link and Content-Length from a HEAD request
+            (None if the request failed or the size is unknown).
+
+    Returns:
+        list[str]: Links in the order they should be downloaded.
+    """
+    return [
+        link
+        for link, size in sorted(
+            probed_links,
+            key=lambda probe: (not probe[0].lower().endswith(".csv"), probe[1] is None, probe[1] or 0)
+        )
+    ]
+
+
+async def probe_link(session, semaphore, link):
+    """
+    Send a HEAD request to find the size and ETag of a download link.
+
+    Args:
+        session (aiohttp.ClientSession): Open HTTP session.
+        semaphore (asyncio.Semaphore): Limits the number of concurrent requests.
+        link (str): Download link to probe.
+
+    Returns:
+        tuple[str, int | None, str | None]: The link, its Content-Length and ETag (None if unavailable).
+    """
+    async with semaphore:
+        try:
+            async with session.head(link, allow_redirects=True) as response:
+                response.raise_for_status()
+                return link, response.content_length, response.headers.get("ETag")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"HEAD request failed for {link}: {e}")
+            return link, None, None
+
+
+async def download_first_available(session, semaphore, links):
+    """
+    Download the first link that succeeds, falling back through the remaining formats.
+
+    Args:
+        session (aiohttp.ClientSession): Open HTTP session.
+        semaphore (asyncio.Semaphore): Limits the number of concurrent requests.
+        links (list[str]): Ranked download links for a single month.
+
+    Returns:
+        tuple[str | None, bytes | None]: The link downloaded and its content, or (None, None).
+    """
+    for link in links:
+        async with semaphore:
+            try:
+                logger.info(f"downloading {link}")
+                async with session.get(link) as response:
+                    response.raise_for_status()
+                    return link, await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"Download failed for {link}: {e}")
+    return None, None
+
+
+async def retrieve_months(links_by_month, concurrency=4):
+    """
+    Probe and download the files for several months concurrently.
+
+    All candidate links are probed with HEAD requests first, then each month is
+    downloaded from its best ranked link with fallback to the other formats.
+
+    Args:
+        links_by_month (dict[str, list[str]]): Candidate download links for each month.
+        concurrency (int): Maximum number of HEAD / download requests running at once.
+
+    Returns:
+        dict[str, tuple[str | None, bytes | None, str | None]]: Downloaded link, content and ETag for each month.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=600)) as session:
+        all_links = [link for links in links_by_month.values() for link in links]
+        probes = {
+            link: (size, etag)
+            for link, size, etag in await asyncio.gather(*(probe_link(session, semaphore, link) for link in all_links))
+        }
+
+        months = list(links_by_month)
+        downloads = await asyncio.gather(*(
+            download_first_available(
+                session,
+                semaphore,
+                rank_links([(link, probes[link][0]) for link in links_by_month[month]])
+            )
+            for month in months
+        ))
+
+    return {
+        month: (link, content, probes.get(link, (None, None))[1])
+        for month, (link, content) in zip(months, downloads)
+    }
+
+
+async def check_revisions(manifest_entries, concurrency=4):
+    """
+    Check previously downloaded files for revisions on the server.
+
+    Each recorded source URL is probed with a HEAD request; files whose ETag or size
+    differs from the manifest are downloaded again.
+
+    Args:
+        manifest_entries (dict[str, dict]): Manifest entries of the months to check.
+        concurrency (int): Maximum number of HEAD / download requests running at once.
+
+    Returns:
+        dict[str, tuple[str | None, bytes | None, str | None]]: Downloaded link, content and ETag
+        for each month whose server file has changed.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=600)) as session:
+        months = list(manifest_entries)
+        probes = await asyncio.gather(*(
+            probe_link(session, semaphore, manifest_entries[month]["source_url"]) for month in months
+        ))
+
+        changed = {}
+        for month, (link, size, etag) in zip(months, probes):
+            entry = manifest_entries[month]
+            if (etag is not None and etag != entry.get("etag")) or (size is not None and size != entry.get("size")):
+                changed[month] = etag
+
+        downloads = await asyncio.gather(*(
+            download_first_available(session, semaphore, [manifest_entries[month]["source_url"]])
+            for month in changed
+        ))
+
+    return {
+        month: (link, content, changed[month])
+        for month, (link, content) in zip(changed, downloads)
+    }
@@ -0,0 +1,293 @@
+# Import necessary libraries
+import atexit
+import logging
+import logging.handlers
+import pickle
+import queue
+import select
+import socketserver
+import struct
+import threading
+import time
+
+# ----------------------------------------------------------------------------------------------------
+#                                       setup variables
+# ----------------------------------------------------------------------------------------------------
+
+# Create logger with dummy name so it can be scaled later if needed
+LOGGER_NAME = "log_dog"
+
+# Shared log line layout - the stage label is centred in a fixed width column
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(stage)s - %(message)s%(fields)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+STAGE_WIDTH = 16
+
+# Structured fields appended to a log line when set with `extra`
+STRUCTURED_FIELDS = ("block", "rows", "elapsed")
+
+# Last emission time of each rate limited debug message
+_last_debug = {}
+
+# ----------------------------------------------------------------------------------------------------
+#                                       Defining functions
+# ----------------------------------------------------------------------------------------------------
+
+class StageFilter(logging.Filter):
+    """
+    Stamps every record with the pipeline stage that created it and defaults
+    for the structured fields.
+
+    Args:
+        stage (str): Stage label, e.g. 'Orchestrator' or 'Module 2'.
+    """
+
+    def __init__(self, stage):
+        super().__init__()
+        self.stage = stage
+
+    def filter(self, record):
+        if not hasattr(record, "stage"):
+            record.stage = f"{self.stage:^{STAGE_WIDTH}}"
+        for field in STRUCTURED_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, None)
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Formatter that appends the structured fields set on a record, e.g.
+    `... - Block Two complete | block=Block Two rows=52311 elapsed=1.42s`.
+    """
+
+    def format(self, record):
+        fields = []
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is None:
+                continue
+            if field == "elapsed":
+                value = f"{value:.2f}s"
+            fields.append(f"{field}={value}")
+        record.fields = f" | {' '.join(fields)}" if fields else ""
+        return super().format(record)
+
+
+class LogRecordStreamHandler(socketserver.StreamRequestHandler):
+    """
+    Reads length-prefixed pickled log records sent by `logging.handlers.SocketHandler`
+    and puts them on the server's queue.
+    """
+
+    def handle(self):
+        with self.server.connection_lock:
+            self.server.active_connections += 1
+        try:
+            self._read_records()
+        finally:
+            with self.server.connection_lock:
+                self.server.active_connections -= 1
+
+    def _read_records(self):
+        while True:
+            header = self.connection.recv(4)
+            if len(header) < 4:
+                break
+            length = struct.unpack(">L", header)[0]
+            data = self.connection.recv(length)
+            while len(data) < length:
+                chunk = self.connection.recv(length - len(data))
+                if not chunk:
+                    return
+                data += chunk
+            record = logging.makeLogRecord(pickle.loads(data))
+            self.server.record_queue.put_nowait(record)
+
+
+class LogRecordSocketReceiver(socketserver.ThreadingTCPServer):
+    """
+    TCP server that receives log records from module subprocesses.
+
+    Args:
+        record_queue (queue.Queue): Queue consumed by the single log writer.
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, record_queue):
+        super().__init__(("127.0.0.1", 0), LogRecordStreamHandler)
+        self.record_queue = record_queue
+        self.active_connections = 0
+        self.connection_lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+def file_handler(log_file):
+    """
+    Create the handler that writes formatted records to the workflow log file.
+
+    Args:
+        log_file (str): Path of the workflow log file.
+
+    Returns:
+        logging.FileHandler: Handler with the shared structured format.
+    """
+    handler = logging.FileHandler(log_file)
+    handler.setFormatter(StructuredFormatter(LOG_FORMAT, datefmt=DATE_FORMAT))
+    return handler
+
+
+def start_log_server(log_file, stage, level="INFO"):
+    """
+    Start the single log writer owned by the orchestrator.
+
+    Records from the orchestrator and from module subprocesses (received over a
+    local socket) go through one queue to one file handler, so lines never
+    interleave mid-write and no process blocks on file I/O.
+
+    Args:
+        log_file (str): Path of the workflow log file.
+        stage (str): Stage label of the calling process.
+        level (str): Minimum log level, e.g. 'INFO' or 'DEBUG'.
+
+    Returns:
+        LogRecordSocketReceiver: Running server; pass `server.port` to modules with `--log-port`.
+    """
+    record_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(record_queue, file_handler(log_file))
+    listener.start()
+
+    server = LogRecordSocketReceiver(record_queue)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    _attach_queue_handler(record_queue, stage, level)
+
+    def stop():
+        server.shutdown()
+        server.server_close()
+        listener.stop()
+
+    atexit.register(stop)
+    return server
+
+
+def flush_logs(server, timeout=5.0):
+    """
+    Wait until every record received so far has been written to the log file.
+
+    Called after a module subprocess exits (so its records land before the
+    orchestrator's next line) and before the log file is pushed.
+
+    Args:
+        server (LogRecordSocketReceiver): Server returned by `start_log_server`.
+        timeout (float): Maximum seconds to wait for module connections to drain.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        pending_connection = select.select([server.socket], [], [], 0)[0]
+        with server.connection_lock:
+            active = server.active_connections
+        if not pending_connection and active == 0:
+            break
+        time.sleep(0.01)
+    server.record_queue.join()
+
+
+def setup_module_logging(log_file, log_port, stage, level="INFO"):
+    """
+    Set up non-blocking logging for a module.
+
+    Records are put on an in-process queue; a background thread forwards them to the
+    orchestrator's log server, or writes them to the log file when the module is
+    run on its own without `--log-port`.
+
+    Args:
+        log_file (str): Path of the workflow log file.
+        log_port (int | None): Port of the orchestrator's log server.
+        stage (str): Stage label, e.g. 'Module 2'.
+        level (str): Minimum log level, e.g. 'INFO' or 'DEBUG'.
+
+    Returns:
+        logging.Logger: The shared pipeline logger.
+    """
+    if log_port:
+        target = logging.handlers.SocketHandler("127.0.0.1", log_port)
+    else:
+        target = file_handler(log_file)
+
+    record_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(record_queue, target)
+    listener.start()
+    atexit.register(listener.stop)
+
+    return _attach_queue_handler(record_queue, stage, level)
+
+
+def _attach_queue_handler(record_queue, stage, level):
+    """
+    Point the shared pipeline logger at a queue.
+
+    Args:
+        record_queue (queue.Queue): Queue consumed by a listener thread.
+        stage (str): Stage label added to every record.
+        level (str): Minimum log level.
+
+    Returns:
+        logging.Logger: The shared pipeline logger.
+    """
+    handler = logging.handlers.QueueHandler(record_queue)
+    handler.addFilter(StageFilter(stage))
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level)
+    logger.addHandler(handler)
+    logger.propagate = False
+    return logger
+
+
+def log_block(logger, block, block_start, rows=None):
+    """
+    Log the completion of a block of work with structured fields.
+
+    Usage:
+        block_start = time.perf_counter()
+        ...
+        log_block(logger, "Block Two", block_start, rows=len(union_data))
+
+    Args:
+        logger (logging.Logger): Pipeline logger.
+        block (str): Block name.
+        block_start (float): `time.perf_counter()` value taken when the block started.
+        rows (int | None): Number of rows the block produced.
+    """
+    logger.info(
+        f"{block} complete",
+        extra={"block": block, "rows": rows, "elapsed": time.perf_counter() - block_start}
+    )
+
+
+def rate_limited_debug(logger, key, message, interval=5.0, **fields):
+    """
+    Log a debug message at most once per interval for a given key.
+
+    Safe to call inside hot loops: when debug logging is disabled this is a single
+    level check, and when enabled most calls return after a dictionary lookup.
+
+    Args:
+        logger (logging.Logger): Pipeline logger.
+        key (str): Identifies the call site being rate limited.
+        message (str): Log message.
+        interval (float): Minimum seconds between messages for the key.
+        **fields: Structured fields (block, rows, elapsed) to attach to the record.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    now = time.monotonic()
+    if now - _last_debug.get(key, float("-inf")) < interval:
+        return
+    _last_debug[key] = now
+    logger.debug(message, extra=fields, stacklevel=2)
@@ -0,0 +1,267 @@
+# Import necessary libraries
+from datetime import datetime
+import argparse
+import logging
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+#                                       setup variables
+# ----------------------------------------------------------------------------------------------------
+
+# Create logger with dummy name so it can be scaled later if needed
+logger = logging.getLogger("log_dog")
+
+# Root folder of the price history store - one sub folder per month (YYYY-MM)
+history_folder = "data and logs/price_history"
+
+# Station-fuel key columns and the separator used to combine them
+KEY_COLUMNS = ['servicestationname', 'address', 'fuelcode']
+KEY_SEPARATOR = "|"
+
+# ----------------------------------------------------------------------------------------------------
+#                                       Defining functions
+# ----------------------------------------------------------------------------------------------------
+
+def month_folder(month, folder=history_folder):
+    """
+    Build the folder path of a month in the price history store.
+
+    Args:
+        month (datetime.date | pd.Timestamp): Any date in the month.
+        folder (str): Root folder of the store (one store per source).
+
+    Returns:
+        str: Path of the month folder.
+    """
+    return os.path.join(folder, f"{month:%Y-%m}")
+
+
+def station_key(servicestationname, address, fuelcode):
+    """
+    Combine a station name, address and fuelcode into a history key.
+
+    Args:
+        servicestationname (str | pd.Series): Station name.
+        address (str | pd.Series): Station address.
+        fuelcode (str | pd.Series): Fuel code.
+
+    Returns:
+        str | pd.Series: Key used to look up the station-fuel series.
+    """
+    return servicestationname + KEY_SEPARATOR + address + KEY_SEPARATOR + fuelcode
+
+
+def load_month(month, folder=history_folder):
+    """
+    Memory-map the arrays of a month in the price history store.
+
+    Args:
+        month (datetime.date | pd.Timestamp): Any date in the month.
+        folder (str): Root folder of the store.
+
+    Returns:
+        dict[str, np.ndarray] | None: keys, offsets, dates, prices and updated arrays,
+        or None if the month has not been stored.
+    """
+    path = month_folder(month, folder)
+    if not os.path.isdir(path):
+        return None
+    return {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+        for name in ['keys', 'offsets', 'dates', 'prices', 'updated']
+    }
+
+
+def month_frame(history):
+    """
+    Expand the arrays of a stored month back into one row per station-fuel and day.
+
+    Args:
+        history (dict[str, np.ndarray]): Month arrays from `load_month`.
+
+    Returns:
+        pd.DataFrame: servicestationname, address, fuelcode, date, price and priceupdateddate columns.
+    """
+    counts = np.diff(history['offsets'])
+    keys = pd.Series(np.repeat(history['keys'], counts)).str.split(KEY_SEPARATOR, n=2, expand=True)
+    keys.columns = KEY_COLUMNS
+    return keys.assign(
+        date=pd.to_datetime(np.asarray(history['dates'])),
+        price=np.asarray(history['prices']),
+        priceupdateddate=pd.to_datetime(np.asarray(history['updated']))
+    )
+
+
+def write_price_history(output, merge=False, folder=history_folder):
+    """
+    Write transformed daily prices to the price history store, one folder per month.
+
+    Rows are sorted by station-fuel key then date, so each key's prices are one
+    contiguous slice found through the key -> offset index. A month is written to a
+    temporary folder and swapped in, so readers never see a half written month.
+
+    Args:
+        output (pd.DataFrame): Transformed daily prices (servicestationname, address,
+            fuelcode, date, price and priceupdateddate).
+        merge (bool): Merge the days into the stored month (daily mode) instead of replacing it.
+        folder (str): Root folder of the store.
+
+    Returns:
+        list[str]: Month folders written.
+    """
+    os.makedirs(folder, exist_ok=True)
+    written = []
+
+    for month, month_output in output.groupby(output['date'].dt.to_period('M')):
+        month_start = month.to_timestamp()
+        frame = month_output[KEY_COLUMNS + ['date', 'price', 'priceupdateddate']]
+
+        stored = load_month(month_start, folder) if merge else None
+        if stored is not None:
+            frame = (
+                pd.concat([month_frame(stored), frame])
+                .drop_duplicates(subset=KEY_COLUMNS + ['date'], keep='last')
+            )
+
+        keys = station_key(frame['servicestationname'], frame['address'], frame['fuelcode']).to_numpy(dtype=str)
+        order = np.lexsort((frame['date'].to_numpy(), keys))
+        keys = keys[order]
+        unique_keys, key_starts = np.unique(keys, return_index=True)
+
+        arrays = {
+            'keys': unique_keys,
+            'offsets': np.append(key_starts, len(keys)).astype(np.int64),
+            'dates': frame['date'].to_numpy().astype('datetime64[D]')[order],
+            'prices': frame['price'].to_numpy(dtype=float)[order],
+            'updated': frame['priceupdateddate'].to_numpy().astype('datetime64[D]')[order],
+        }
+
+        path = month_folder(month_start, folder)
+        temporary_folder = f"{path}.tmp"
+        shutil.rmtree(temporary_folder, ignore_errors=True)
+        os.makedirs(temporary_folder)
+        for name, array in arrays.items():
+            np.save(os.path.join(temporary_folder, f"{name}.npy"), array)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(temporary_folder, path)
+
+        logger.info(f"Price history {path} written with {len(keys)} rows for {len(unique_keys)} station-fuels")
+        written.append(path)
+
+    return written
+
+
+def price_series(servicestationname, address, fuelcode, start_date, end_date, folder=history_folder):
+    """
+    Daily price series of one station and fuelcode between two dates.
+
+    Args:
+        servicestationname (str): Station name.
+        address (str): Station address.
+        fuelcode (str): Fuel code, e.g. 'E10'.
+        start_date (datetime.date): First day of the series.
+        end_date (datetime.date): Last day of the series.
+        folder (str): Root folder of the store.
+
+    Returns:
+        pd.DataFrame: date, price and priceupdateddate for every stored day in the range.
+    """
+    key = station_key(servicestationname, address, fuelcode)
+    start = np.datetime64(start_date, 'D')
+    end = np.datetime64(end_date, 'D')
+    series = []
+
+    for month_start in pd.date_range(pd.Timestamp(start_date).replace(day=1), end_date, freq='MS'):
+        history = load_month(month_start, folder)
+        if history is None:
+            continue
+
+        # Binary search for the key, then slice its contiguous rows
+        position = np.searchsorted(history['keys'], key)
+        if position == len(history['keys']) or history['keys'][position] != key:
+            continue
+        rows = slice(history['offsets'][position], history['offsets'][position + 1])
+
+        dates = history['dates'][rows]
+        in_range = (dates >= start) & (dates <= end)
+        series.append(pd.DataFrame({
+            'date': pd.to_datetime(dates[in_range]),
+            'price': history['prices'][rows][in_range],
+            'priceupdateddate': pd.to_datetime(history['updated'][rows][in_range]),
+        }))
+
+    if not series:
+        return pd.DataFrame({
+            'date': pd.Series(dtype='datetime64[s]'),
+            'price': pd.Series(dtype=float),
+            'priceupdateddate': pd.Series(dtype='datetime64[s]'),
+        })
+    return pd.concat(series, ignore_index=True)
+
+
+def prices_on(price_date, folder=history_folder):
+    """
+    Price of every stored station-fuel on a date.
+
+    Args:
+        price_date (datetime.date): Price date.
+        folder (str): Root folder of the store.
+
+    Returns:
+        pd.DataFrame | None: servicestationname, address, fuelcode, price and lastupdated
+        (last price update up to the date within its month), or None if the month is not stored.
+    """
+    history = load_month(price_date, folder)
+    if history is None:
+        return None
+
+    day = np.datetime64(price_date, 'D')
+    rows = np.flatnonzero(history['dates'] == day)
+    if len(rows) == 0:
+        return None
+
+    # Map every row back to its key through the offsets
+    key_positions = np.searchsorted(history['offsets'], rows, side='right') - 1
+
+    # Last update up to the date: the running maximum of the update dates in each key's slice
+    month_rows = history['dates'] <= day
+    updated = pd.Series(np.asarray(history['updated']))[month_rows]
+    row_keys = np.searchsorted(history['offsets'], np.flatnonzero(month_rows), side='right') - 1
+    last_updates = updated.groupby(row_keys).max()
+
+    prices = pd.Series(history['keys'][key_positions]).str.split(KEY_SEPARATOR, n=2, expand=True)
+    prices.columns = KEY_COLUMNS
+    return prices.assign(
+        price=history['prices'][rows],
+        lastupdated=pd.to_datetime(last_updates.reindex(key_positions).to_numpy())
+    )
+
+# ----------------------------------------------------------------------------------------------------
+#                                     Script Body - Start
+# ----------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Look up prices in the local price history store")
+    parser.add_argument("--date", required=True, help="YYYY-MM-DD (start date when --station is given)")
+    parser.add_argument("--end-date", help="YYYY-MM-DD, last day of a station series")
+    parser.add_argument("--station", help="station name")
+    parser.add_argument("--address", help="station address")
+    parser.add_argument("--fuelcode", help="fuel code, e.g. E10")
+    parser.add_argument("--folder", default=history_folder, help="store root folder (default: NSW store)")
+    args = parser.parse_args()
+
+    price_date = datetime.strptime(args.date, "%Y-%m-%d").date()
+    if args.station:
+        end_date = datetime.strptime(args.end_date, "%Y-%m-%d").date() if args.end_date else price_date
+        result = price_series(args.station, args.address, args.fuelcode, price_date, end_date, args.folder)
+    else:
+        result = prices_on(price_date, args.folder)
+
+    if result is None:
+        print(f"No price history stored for {price_date:%Y-%m}")
+    else:
+        print(result.to_string(index=False))
@@ -0,0 +1,283 @@
+# Import necessary libraries
+import hashlib
+import logging
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+# ----------------------------------------------------------------------------------------------------
+#                                       setup variables
+# ----------------------------------------------------------------------------------------------------
+
+# Create logger with dummy name so it can be scaled later if needed
+logger = logging.getLogger("log_dog")
+
+# Station-fuel key columns
+KEY_COLUMNS = ['servicestationname', 'address', 'fuelcode']
+
+# Interval table and the view expanding it back to one row per station-fuel and day.
+# The view takes the staging table's name so readers of stg_fuel_price (module 4's
+# check_data_quality(), modules 5 and 6) keep working; daily rows staged before
+# intervals mode was switched on move to the dense table.
+INTERVAL_TABLE = "stg_fuel_price_intervals"
+DENSE_TABLE = "stg_fuel_price_dense"
+DAILY_VIEW = "stg_fuel_price"
+
+# Filled with the interval and dense table names (sources other than NSW add a table suffix)
+INTERVAL_TABLES_SQL = """
+CREATE TABLE IF NOT EXISTS public.{interval_table} (
+    record_id TEXT,
+    servicestationname TEXT,
+    address TEXT,
+    fuelcode TEXT,
+    valid_from TIMESTAMP WITHOUT TIME ZONE,
+    valid_to TIMESTAMP WITHOUT TIME ZONE,
+    price FLOAT(53),
+    priceupdateddate TIMESTAMP WITHOUT TIME ZONE
+);
+CREATE TABLE IF NOT EXISTS public.{dense_table} (
+    record_id TEXT,
+    servicestationname TEXT,
+    address TEXT,
+    fuelcode TEXT,
+    date TIMESTAMP WITHOUT TIME ZONE,
+    price FLOAT(53),
+    priceupdateddate TIMESTAMP WITHOUT TIME ZONE
+);
+"""
+
+# Filled with the view, dense table and interval table names. Expanded rows get the record_id
+# the daily output gives the same station, fuel, price and day (prices formatted like Python's
+# str(float), e.g. '200.0'), so it does not change when an interval is split or re-staged.
+DAILY_VIEW_SQL = """
+CREATE OR REPLACE VIEW public.{daily_view} AS
+SELECT
+    dense.record_id,
+    dense.servicestationname,
+    dense.address,
+    dense.fuelcode,
+    dense.date,
+    dense.price,
+    dense.priceupdateddate
+FROM
+    public.{dense_table} AS dense
+UNION ALL
+SELECT
+    md5(concat_ws('|',
+        intervals.servicestationname,
+        intervals.address,
+        intervals.fuelcode,
+        CASE
+            WHEN intervals.price = trunc(intervals.price) THEN CAST(CAST(intervals.price AS BIGINT) AS TEXT) || '.0'
+            ELSE CAST(intervals.price AS TEXT)
+        END,
+        to_char(days.date, 'YYYY-MM-DD')
+    )) AS record_id,
+    intervals.servicestationname,
+    intervals.address,
+    intervals.fuelcode,
+    CAST(days.date AS TIMESTAMP WITHOUT TIME ZONE) AS date,
+    intervals.price,
+    CASE WHEN days.date = intervals.valid_from THEN intervals.priceupdateddate END AS priceupdateddate
+FROM
+    public.{interval_table} AS intervals
+    CROSS JOIN LATERAL generate_series(intervals.valid_from, intervals.valid_to, INTERVAL '1 day') AS days(date)
+"""
+
+# ----------------------------------------------------------------------------------------------------
+#                                       Defining functions
+# ----------------------------------------------------------------------------------------------------
+
+def price_intervals(output):
+    """
+    Collapse daily prices into intervals of unchanged price per station-fuel.
+
+    A new interval starts whenever the price differs from the previous day, a day is
+    missing or the price is reported again (a price update day). An interval's only
+    update is therefore on its first day, so expanding the intervals gives back the
+    daily prices and update dates exactly.
+
+    Args:
+        output (pd.DataFrame): Transformed daily prices (servicestationname, address,
+            fuelcode, date, price and priceupdateddate).
+
+    Returns:
+        pd.DataFrame: record_id, servicestationname, address, fuelcode, valid_from,
+        valid_to, price and priceupdateddate (update on valid_from, NaT for carried prices).
+    """
+    daily = output.sort_values(KEY_COLUMNS + ['date']).reset_index(drop=True)
+
+    same_key = (daily[KEY_COLUMNS] == daily[KEY_COLUMNS].shift()).all(axis=1)
+    same_price = daily['price'] == daily['price'].shift()
+    next_day = daily['date'] - daily['date'].shift() == pd.Timedelta(days=1)
+    updated = daily['priceupdateddate'].notna()
+    interval_number = (~(same_key & same_price & next_day) | updated).cumsum()
+
+    intervals = (
+        daily
+        .groupby(interval_number)
+        .agg(
+            servicestationname=('servicestationname', 'first'),
+            address=('address', 'first'),
+            fuelcode=('fuelcode', 'first'),
+            valid_from=('date', 'min'),
+            valid_to=('date', 'max'),
+            price=('price', 'first'),
+            priceupdateddate=('priceupdateddate', 'min')  # the first day's update (or NaT)
+        )
+        .reset_index(drop=True)
+    )
+
+    intervals.insert(0, 'record_id', interval_record_ids(intervals))
+
+    return intervals
+
+
+def interval_record_ids(intervals):
+    """
+    Deterministic record_id per interval start.
+
+    Args:
+        intervals (pd.DataFrame): Intervals with the key columns, price and valid_from.
+
+    Returns:
+        pd.Series: MD5 hash of the key, price and valid_from of every interval.
+    """
+    concat_cols = (
+        intervals[KEY_COLUMNS + ['price', 'valid_from']]
+        .astype(str)
+        .agg('|'.join, axis=1)
+    )
+    return concat_cols.map(lambda value: hashlib.md5(value.encode("utf-8")).hexdigest())
+
+
+def expand_price_intervals(intervals, start_date=None, end_date=None):
+    """
+    Expand price intervals back to one row per station-fuel and day.
+
+    Args:
+        intervals (pd.DataFrame): Intervals created by `price_intervals`.
+        start_date (datetime.date | None): First day to return (all days when None).
+        end_date (datetime.date | None): Last day to return (all days when None).
+
+    Returns:
+        pd.DataFrame: servicestationname, address, fuelcode, date, price and priceupdateddate.
+    """
+    days = (pd.to_datetime(intervals['valid_to']) - pd.to_datetime(intervals['valid_from'])).dt.days + 1
+    daily = intervals.loc[intervals.index.repeat(days)].copy()
+    day_number = daily.groupby(level=0).cumcount().to_numpy()
+    daily['date'] = pd.to_datetime(daily['valid_from']) + pd.to_timedelta(day_number, unit='D')
+    daily['priceupdateddate'] = daily['priceupdateddate'].where(day_number == 0)
+
+    if start_date is not None:
+        daily = daily[daily['date'] >= pd.Timestamp(start_date)]
+    if end_date is not None:
+        daily = daily[daily['date'] <= pd.Timestamp(end_date)]
+
+    return daily[KEY_COLUMNS + ['date', 'price', 'priceupdateddate']].reset_index(drop=True)
+
+
+def prepare_interval_tables(connection, table_suffix=""):
+    """
+    Create the interval and dense tables if missing and (re)create the daily view.
+
+    A staging table still holding daily rows from before intervals mode is renamed
+    to the dense table (or merged into it) so the view can take its name.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): Open database connection.
+        table_suffix (str): Suffix of the source's staging tables ("" for NSW).
+    """
+    daily_view = f"{DAILY_VIEW}{table_suffix}"
+    dense_table = f"{DENSE_TABLE}{table_suffix}"
+    interval_table = f"{INTERVAL_TABLE}{table_suffix}"
+
+    tables = inspect(connection).get_table_names(schema="public")
+    if daily_view in tables:
+        if dense_table in tables:
+            connection.execute(text(f"INSERT INTO public.{dense_table} SELECT * FROM public.{daily_view}"))
+            connection.execute(text(f"DROP TABLE public.{daily_view}"))
+        else:
+            connection.execute(text(f"ALTER TABLE public.{daily_view} RENAME TO {dense_table}"))
+        logger.info(f"Daily staging table {daily_view} moved to {dense_table}")
+
+    connection.execute(text(INTERVAL_TABLES_SQL.format(interval_table=interval_table, dense_table=dense_table)))
+    connection.execute(text(DAILY_VIEW_SQL.format(daily_view=daily_view, dense_table=dense_table, interval_table=interval_table)))
+    logger.info(f"View {daily_view} created")
+
+
+def clear_staged_range(connection, start_date, end_date, table_suffix=""):
+    """
+    Remove staged prices between two dates so the range can be loaded again.
+
+    Dense rows in the range are deleted, and intervals overlapping it are cut back
+    to the days outside the range.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): Open database connection.
+        start_date (datetime.date): First day of the range.
+        end_date (datetime.date): Last day of the range.
+        table_suffix (str): Suffix of the source's staging tables ("" for NSW).
+    """
+    dense_table = f"{DENSE_TABLE}{table_suffix}"
+    interval_table = f"{INTERVAL_TABLE}{table_suffix}"
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    params = {"start_date": start.to_pydatetime(), "end_date": end.to_pydatetime()}
+
+    connection.execute(text(f"DELETE FROM public.{dense_table} WHERE date BETWEEN :start_date AND :end_date"), params)
+
+    overlap = "valid_from <= :end_date AND valid_to >= :start_date"
+    overlapping = pd.read_sql(text(f"SELECT * FROM public.{interval_table} WHERE {overlap}"), connection, params=params)
+    if overlapping.empty:
+        return
+    connection.execute(text(f"DELETE FROM public.{interval_table} WHERE {overlap}"), params)
+
+    # Days before the range keep their interval; days after it start a new one with no update date
+    before = overlapping[overlapping['valid_from'] < start].assign(valid_to=start - pd.Timedelta(days=1))
+    after = overlapping[overlapping['valid_to'] > end].assign(valid_from=end + pd.Timedelta(days=1), priceupdateddate=pd.NaT)
+    after = after.assign(record_id=interval_record_ids(after)) if not after.empty else after
+    kept = pd.concat([before, after], ignore_index=True)
+    if not kept.empty:
+        kept.to_sql(interval_table, connection, schema='public', if_exists='append', index=False)
+    logger.info(f"{len(overlapping)} intervals overlapping {start.date()} - {end.date()} cut back")
+
+
+def extend_open_intervals(connection, intervals, table_suffix=""):
+    """
+    Extend stored intervals ending the day before a run that carry on into it.
+
+    An interval starting on the run's first day with the same key and price as one
+    ending the day before, and no price update that day, continues that interval, so
+    runs of a few days do not split intervals at every run boundary.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): Open database connection.
+        intervals (pd.DataFrame): Intervals of the run from `price_intervals`.
+        table_suffix (str): Suffix of the source's staging tables ("" for NSW).
+
+    Returns:
+        pd.DataFrame: The run's intervals still to be inserted.
+    """
+    if intervals.empty:
+        return intervals
+    interval_table = f"{INTERVAL_TABLE}{table_suffix}"
+    first_day = pd.Timestamp(intervals['valid_from'].min())
+
+    open_intervals = pd.read_sql(
+        text(f"SELECT record_id, {', '.join(KEY_COLUMNS)}, price FROM public.{interval_table} WHERE valid_to = :previous_day"),
+        connection, params={"previous_day": (first_day - pd.Timedelta(days=1)).to_pydatetime()}
+    )
+    carried = intervals[(pd.to_datetime(intervals['valid_from']) == first_day) & intervals['priceupdateddate'].isna()]
+    extended = carried.reset_index().merge(open_intervals, on=KEY_COLUMNS + ['price'], suffixes=('', '_open'))
+    if extended.empty:
+        return intervals
+
+    connection.execute(
+        text(f"UPDATE public.{interval_table} SET valid_to = :valid_to WHERE record_id = :record_id"),
+        [
+            {"valid_to": pd.Timestamp(valid_to).to_pydatetime(), "record_id": record_id}
+            for valid_to, record_id in zip(extended['valid_to'], extended['record_id_open'])
+        ]
+    )
+    logger.info(f"{len(extended)} open intervals extended to the new run")
+    return intervals.drop(index=extended['index'])
@@ -0,0 +1,241 @@
+# Import necessary libraries
+from datetime import datetime
+from html.parser import HTMLParser
+from io import BytesIO, StringIO # to read the raw xlsx or csv file
+from urllib.parse import unquote
+import logging
+import os
+import re
+
+# ----------------------------------------------------------------------------------------------------
+#                                       setup variables
+# ----------------------------------------------------------------------------------------------------
+
+# Create logger with dummy name so it can be scaled later if needed
+logger = logging.getLogger("log_dog")
+
+# Source whose state lives in config.json and data in 'data and logs' (the original NSW pipeline)
+DEFAULT_SOURCE = "nsw"
+
+# Columns of the monthly files read by the transform (module 2)
+TRANSFORM_COLUMNS = ['ServiceStationName', 'Address', 'Suburb', 'Postcode', 'Brand', 'FuelCode', 'PriceUpdatedDate', 'Price']
+
+# ----------------------------------------------------------------------------------------------------
+#                                       Defining functions
+# ----------------------------------------------------------------------------------------------------
+
+class SourceAdapter:
+    """
+    A fuel price dataset published as monthly files linked from a web page.
+
+    Subclasses set the dataset page, how months appear in file links and how the
+    file columns map to the transform's schema. Every source has its own config file
+    (month cursor and settings), data folder and staging tables, so sources can run
+    side by side without sharing state.
+
+    Attributes:
+        name (str): Source name used with `--source`.
+        dataset_url (str): Default dataset page (overridden by `dataset_url` in the source config).
+        file_extensions (tuple[str, ...]): File types linked from the page.
+        month_pattern (re.Pattern): Month name and year in a file link.
+        column_map (dict[str, str]): Source column -> transform column renames.
+        seed_from_fact_tables (bool): Whether `fact_fuel_prices` holds this source's prices
+            (used to seed the transform when no snapshot exists).
+        match_stations (bool): Whether the file's stations are matched to `dim_fuel_stations`.
+    """
+
+    name = None
+    dataset_url = None
+    file_extensions = (".xlsx", ".csv")
+    month_pattern = re.compile(r"(?<![a-z])(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*[^a-z0-9]{0,3}(\d{4})")
+    column_map = {}
+    seed_from_fact_tables = False
+    match_stations = False
+
+    @property
+    def is_default(self):
+        return self.name == DEFAULT_SOURCE
+
+    @property
+    def config_file(self):
+        return "config.json" if self.is_default else f"config_{self.name}.json"
+
+    @property
+    def data_folder(self):
+        return "data and logs" if self.is_default else f"data and logs/{self.name}"
+
+    @property
+    def table_suffix(self):
+        return "" if self.is_default else f"_{self.name}"
+
+    def stage(self, module):
+        """
+        Log stage label of a module run for this source, e.g. 'Module 1' or 'Module 1 qld'.
+
+        Args:
+            module (str): Module label.
+
+        Returns:
+            str: Stage label.
+        """
+        return module if self.is_default else f"{module} {self.name}"
+
+    def link_month(self, href):
+        """
+        Extract the month of a dataset file link.
+
+        Args:
+            href (str): Link to a data file.
+
+        Returns:
+            str | None: Month in config format (e.g. 'jan2026'), or None if no month is found.
+        """
+        match = self.month_pattern.search(os.path.basename(unquote(href).lower()))
+        if match is None:
+            return None
+        return f"{match.group(1)}{match.group(2)}"
+
+    def discover_links(self, url, wanted_months):
+        """
+        Stream the dataset page and collect file links by month, stopping early once
+        the wanted months have been found.
+
+        Args:
+            url (str): Dataset page URL.
+            wanted_months (list[str]): Months the run is looking for, in config format.
+
+        Returns:
+            dict[str, list[str]]: Download links for every month seen on the page.
+        """
+        import requests
+
+        parser = DatasetLinkParser(self, wanted_months)
+        with requests.get(url, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            response.encoding = response.encoding or "utf-8"
+            for chunk in response.iter_content(chunk_size=16384, decode_unicode=True):
+                parser.feed(chunk)
+                if parser.found_all():
+                    logger.info("all month links found - stopping page read early")
+                    break
+        return parser.links_by_month
+
+    def read_file(self, link, content):
+        """
+        Read a downloaded file.
+
+        Args:
+            link (str): Link the file was downloaded from (used to detect the format).
+            content (bytes): Raw file content.
+
+        Returns:
+            pd.DataFrame: File contents.
+        """
+        import pandas as pd
+
+        if link.lower().endswith(".xlsx"):
+            return pd.read_excel(BytesIO(content))
+        return pd.read_csv(StringIO(content.decode("utf-8")))
+
+    def normalize(self, df):
+        """
+        Rename and order the file columns to the transform's schema.
+
+        Args:
+            df (pd.DataFrame): File contents from `read_file`.
+
+        Returns:
+            pd.DataFrame: The `TRANSFORM_COLUMNS` (missing columns are left empty).
+        """
+        return df.rename(columns=self.column_map).reindex(columns=TRANSFORM_COLUMNS)
+
+
+class NswFuelCheck(SourceAdapter):
+    """NSW FuelCheck monthly price history on data.nsw.gov.au."""
+
+    name = "nsw"
+    dataset_url = "https://data.nsw.gov.au/data/dataset/fuel-check"
+    seed_from_fact_tables = True
+    match_stations = True
+
+    def normalize(self, df):
+        # The transform schema is the FuelCheck layout, so files are kept as published
+        return df
+
+
+class DatasetLinkParser(HTMLParser):
+    """
+    Incremental HTML parser that collects data file links by month as the page streams in.
+
+    Only <a> start tags are inspected, so no document tree is built.
+
+    Args:
+        source (SourceAdapter): Source the page belongs to.
+        wanted_months (list[str]): Months the run is looking for, in config format.
+    """
+
+    def __init__(self, source, wanted_months):
+        super().__init__()
+        self.source = source
+        self.wanted_months = wanted_months
+        self.links_by_month = {}
+        self.passed_wanted_months = False
+        self.oldest_wanted = min((datetime.strptime(month, "%b%Y") for month in wanted_months), default=None)
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "a":
+            return
+        href = dict(attrs).get("href")
+        if not href or not href.lower().endswith(self.source.file_extensions):
+            return
+        month = self.source.link_month(href)
+        if month is None:
+            return
+
+        links = self.links_by_month.setdefault(month, [])
+        if href not in links:
+            links.append(href)
+
+        # An older month after every wanted month means their format variants have all been listed
+        if (
+            self.oldest_wanted is not None
+            and datetime.strptime(month, "%b%Y") < self.oldest_wanted
+            and all(wanted in self.links_by_month for wanted in self.wanted_months)
+        ):
+            self.passed_wanted_months = True
+
+    def found_all(self):
+        """
+        Check whether the links for every wanted month have been found.
+
+        Returns:
+            bool: True once every wanted month has a CSV link, or the page has moved past them.
+        """
+        wanted_links = [self.links_by_month.get(month) for month in self.wanted_months]
+        if not wanted_links or not all(wanted_links):
+            return False
+        return self.passed_wanted_months or all(
+            any(link.lower().endswith(".csv") for link in links) for links in wanted_links
+        )
+
+
+# Registered sources - add a SourceAdapter subclass here to run another dataset
+SOURCES = {source.name: source for source in [NswFuelCheck()]}
+
+
+def get_source(name):
+    """
+    Look up a registered source.
+
+    Args:
+        name (str): Source name, e.g. 'nsw'.
+
+    Returns:
+        SourceAdapter: The source adapter.
+
+    Raises:
+        ValueError: If no source is registered under the name.
+    """
+    if name not in SOURCES:
+        raise ValueError(f"Unknown source '{name}' - registered sources: {', '.join(SOURCES)}")
+    return SOURCES[name]
@@ -0,0 +1,268 @@
+# Import necessary libraries
+import argparse
+import hashlib
+import os
+
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+#                                       setup variables
+# ----------------------------------------------------------------------------------------------------
+
+# Input frames of a station shard, saved as <name>.parquet in the shard folder
+SHARD_INPUTS = ['df_fuel_data', 'union_data', 'last_month_price_data', 'date_range_df']
+
+# Output of a station shard, saved next to its inputs
+SHARD_OUTPUT = "output.parquet"
+
+# ----------------------------------------------------------------------------------------------------
+#                                       Defining functions
+# ----------------------------------------------------------------------------------------------------
+
+# Hash function to create deterministic fingerprint of each row
+def generate_md5_hash(value: str) -> str:
+    """
+    Generate an MD5 hash for a given string.
+
+    Args:
+        value (str): The input string to hash.
+
+    Returns:
+        str: A 32-character hexadecimal MD5 hash of the input string.
+    """
+    encoded = value.encode("utf-8")  # convert string to bytes (required for hashing)
+    hash_object = hashlib.md5(encoded)  # generate MD5 hash object
+    return hash_object.hexdigest()  # return 32-character hexadecimal string
+
+
+def transform_station_fuel(df_fuel_data, union_data, last_month_price_data, date_range_df):
+    """
+    Expand, price and forward fill the daily series for a set of station-fuel combinations.
+
+    Runs the Block Three and Block Four transformations. Every step is independent per
+    station-fuel group, so the inputs can be the full month or a single station shard.
+
+    Args:
+        df_fuel_data (pd.DataFrame): Cleaned monthly fuel data from Block One.
+        union_data (pd.DataFrame): Station-fuel combinations from Block Two.
+        last_month_price_data (pd.DataFrame): Prices on the last day of the previous month.
+        date_range_df (pd.DataFrame): Full date range of the month, including the seed day.
+
+    Returns:
+        pd.DataFrame: Daily prices for the current month with a deterministic record_id.
+    """
+    # Create a cross join of unique station-fuel combinations with the date range
+    # Sort the DataFrame ready for forward fill
+    date_station_fuel_expanded = (
+        union_data
+        .merge(date_range_df, how='cross')
+        .sort_values(by=['servicestationname','address','fuelcode','date'])
+    )
+
+    # Calculate the median price per day for each station and fuel type
+    daily_median_prices = (
+        df_fuel_data
+        .groupby(['servicestationname','address','fuelcode','date'])['price']
+        .median()
+        .reset_index()
+    )
+
+    # Every station Left join median prices 
+    semijoined_data = (
+        date_station_fuel_expanded
+        .merge(
+            daily_median_prices,
+            left_on=['servicestationname', 'address', 'fuelcode', 'date'],
+            right_on=['servicestationname', 'address', 'fuelcode', 'date'],
+            how='left')
+    )
+
+    # Every station Left join last_day_of_last_month prices 
+    joined_data = (
+        semijoined_data
+        .merge(
+            last_month_price_data,
+            left_on=['servicestationname', 'address', 'fuelcode', 'date'],
+            right_on=['name', 'address', 'fuelcode', 'date'],
+            how='left')
+    )
+
+    # Ensure price columns are numeric before combining
+    joined_data['price_x'] = joined_data['price_x'].astype(float)
+    joined_data['price_y'] = joined_data['price_y'].astype(float)
+
+    # Combine prices into one column
+    joined_data['price'] = joined_data['price_x'].fillna(joined_data['price_y'])
+
+    # Drop redundant price columns if desired
+    joined_data = joined_data.drop(columns=['price_x', 'price_y'])
+
+    # set PriceUpdatedDate to date where Price is not Null
+    joined_data['priceupdateddate']= joined_data['date'].where(~joined_data['price'].isna(), pd.NaT)
+
+    # Forward fill 'Price' within each 'servicestationname', 'address', 'fuelcode' group
+    joined_data['price'] = joined_data.groupby(['servicestationname', 'address', 'fuelcode'])['price'].ffill()
+
+    # Remove null price
+    drop_nulls = joined_data.dropna(subset = ['price']).reset_index(drop=True)
+
+    # Remove the seed day
+    seed_date = date_range_df['date'].min()
+    output = drop_nulls[drop_nulls['date'] > seed_date].copy()
+
+    # Generate deterministic record_id for each fuel price observation
+    # Step 1: Select key columns and concatenate them into a single string
+    concat_cols = (
+        output[['servicestationname','address','fuelcode','price','date']]  # key columns
+        .astype(str)  # ensure consistent string representation before hashing
+        .agg('|'.join, axis=1)  # combine columns row-wise using a stable delimiter
+    )
+    # Step 2: Apply hash function to each concatenated row to create record_id
+    output['record_id'] = concat_cols.map(generate_md5_hash)
+
+    #order & rename the final output columns
+    return output[['record_id', 'servicestationname', 'address', 'fuelcode', 'date', 'price', 'priceupdateddate']]
+
+
+def transform_station_fuel_duckdb(df_fuel_data, union_data, last_month_price_data, date_range_df):
+    """
+    DuckDB version of `transform_station_fuel`.
+
+    Expresses the date spine, daily median, seed join, carry-forward and record hashing
+    as one SQL query over the input frames, so DuckDB runs it multi-threaded instead of
+    materialising every intermediate frame. The inputs and output are in-memory frames.
+
+    Args:
+        df_fuel_data (pd.DataFrame): Cleaned monthly fuel data from Block One.
+        union_data (pd.DataFrame): Station-fuel combinations from Block Two.
+        last_month_price_data (pd.DataFrame): Prices on the last day of the previous month.
+        date_range_df (pd.DataFrame): Full date range of the month, including the seed day.
+
+    Returns:
+        pd.DataFrame: Daily prices for the current month with the same record_ids as the pandas path.
+    """
+    import duckdb
+
+    transform_query = """
+    WITH expanded AS (
+        SELECT
+            union_data.servicestationname,
+            union_data.address,
+            union_data.fuelcode,
+            date_range_df.date
+        FROM union_data
+        CROSS JOIN date_range_df
+    ),
+    daily_median_prices AS (
+        SELECT
+            servicestationname,
+            address,
+            fuelcode,
+            date,
+            median(CAST(price AS DOUBLE)) AS price
+        FROM df_fuel_data
+        GROUP BY servicestationname, address, fuelcode, date
+    ),
+    joined_data AS (
+        SELECT
+            expanded.servicestationname,
+            expanded.address,
+            expanded.fuelcode,
+            expanded.date,
+            coalesce(daily_median_prices.price, CAST(last_month_price_data.price AS DOUBLE)) AS price
+        FROM expanded
+        LEFT JOIN daily_median_prices
+            ON daily_median_prices.servicestationname = expanded.servicestationname
+            AND daily_median_prices.address = expanded.address
+            AND daily_median_prices.fuelcode = expanded.fuelcode
+            AND daily_median_prices.date = expanded.date
+        LEFT JOIN last_month_price_data
+            ON last_month_price_data.name = expanded.servicestationname
+            AND last_month_price_data.address = expanded.address
+            AND last_month_price_data.fuelcode = expanded.fuelcode
+            AND last_month_price_data.date = expanded.date
+    ),
+    filled_data AS (
+        SELECT
+            servicestationname,
+            address,
+            fuelcode,
+            date,
+            last_value(price IGNORE NULLS) OVER (
+                PARTITION BY servicestationname, address, fuelcode
+                ORDER BY date
+                ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+            ) AS price,
+            CASE WHEN price IS NOT NULL THEN date END AS priceupdateddate
+        FROM joined_data
+    )
+    SELECT
+        md5(concat_ws('|',
+            servicestationname,
+            address,
+            fuelcode,
+            CAST(price AS VARCHAR),
+            strftime(date, '%Y-%m-%d')
+        )) AS record_id,
+        servicestationname,
+        address,
+        fuelcode,
+        date,
+        price,
+        priceupdateddate
+    FROM filled_data
+    WHERE
+        price IS NOT NULL
+        AND date > (SELECT min(date) FROM date_range_df)
+    ORDER BY servicestationname, address, fuelcode, date
+    """
+
+    with duckdb.connect() as connection:
+        for name, frame in [
+            ("df_fuel_data", df_fuel_data[['servicestationname', 'address', 'fuelcode', 'date', 'price']]),
+            ("union_data", union_data),
+            ("last_month_price_data", last_month_price_data[['name', 'address', 'fuelcode', 'date', 'price']]),
+            ("date_range_df", date_range_df),
+        ]:
+            connection.register(name, frame)
+        output = connection.execute(transform_query).df()
+
+    for column in ['date', 'priceupdateddate']:
+        output[column] = pd.to_datetime(output[column])
+    return output
+
+
+def save_shard_inputs(folder, df_fuel_data, union_data, last_month_price_data, date_range_df):
+    """
+    Save the inputs of a station shard for a worker process.
+
+    Args:
+        folder (str): Shard folder (created if missing).
+        df_fuel_data (pd.DataFrame): Cleaned fuel data of the shard's stations.
+        union_data (pd.DataFrame): Station-fuel combinations of the shard.
+        last_month_price_data (pd.DataFrame): Seed prices of the shard's stations.
+        date_range_df (pd.DataFrame): Full date range, including the seed day.
+    """
+    os.makedirs(folder, exist_ok=True)
+    for name, frame in zip(SHARD_INPUTS, [df_fuel_data, union_data, last_month_price_data, date_range_df]):
+        frame.to_parquet(os.path.join(folder, f"{name}.parquet"), index=False)
+
+
+def transform_shard_folder(folder):
+    """
+    Transform the station shard saved in a folder and save its output next to the inputs.
+
+    Args:
+        folder (str): Shard folder written by `save_shard_inputs`.
+    """
+    inputs = [pd.read_parquet(os.path.join(folder, f"{name}.parquet")) for name in SHARD_INPUTS]
+    transform_station_fuel(*inputs).to_parquet(os.path.join(folder, SHARD_OUTPUT), index=False)
+
+
+# Worker entry point - module 2 runs one fresh interpreter per station shard
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transform a station shard saved by module 2")
+    parser.add_argument("folder", help="shard folder written by save_shard_inputs")
+    args = parser.parse_args()
+
+    transform_shard_folder(args.folder)
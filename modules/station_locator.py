@@ -0,0 +1,313 @@
+# Import necessary libraries
+from datetime import datetime
+from sqlalchemy import bindparam, create_engine, text
+import argparse
+import json
+import logging
+import numpy as np
+import os
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+#                                       setup variables
+# ----------------------------------------------------------------------------------------------------
+
+# Create logger with dummy name so it can be scaled later if needed
+logger = logging.getLogger("log_dog")
+
+# Location of the persisted spatial index
+index_file = "data and logs/station_index.npz"
+
+# Mean earth radius and the latitude the equirectangular projection is centred on (NSW)
+EARTH_RADIUS_KM = 6371.0
+REFERENCE_LATITUDE = -33.0
+
+# ----------------------------------------------------------------------------------------------------
+#                                       Defining functions
+# ----------------------------------------------------------------------------------------------------
+
+def project(latitude, longitude):
+    """
+    Project coordinates onto a flat plane in kilometres (equirectangular around NSW).
+
+    Args:
+        latitude (np.ndarray | float): Latitudes in degrees.
+        longitude (np.ndarray | float): Longitudes in degrees.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: x and y coordinates in kilometres.
+    """
+    x = EARTH_RADIUS_KM * np.radians(longitude) * np.cos(np.radians(REFERENCE_LATITUDE))
+    y = EARTH_RADIUS_KM * np.radians(latitude)
+    return x, y
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """
+    Great-circle distance in kilometres from one point to many points.
+
+    Args:
+        latitude (float): Latitude of the origin in degrees.
+        longitude (float): Longitude of the origin in degrees.
+        latitudes (np.ndarray): Latitudes of the destinations in degrees.
+        longitudes (np.ndarray): Longitudes of the destinations in degrees.
+
+    Returns:
+        np.ndarray: Distance to every destination in kilometres.
+    """
+    lat1, lon1 = np.radians(latitude), np.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def cell_keys(x, y, cell_km):
+    """
+    Combine grid cell coordinates into a single sortable key.
+
+    Args:
+        x (np.ndarray): Projected x coordinates in kilometres.
+        y (np.ndarray): Projected y coordinates in kilometres.
+        cell_km (float): Grid cell size in kilometres.
+
+    Returns:
+        np.ndarray: int64 cell key for every point.
+    """
+    cell_x = np.floor(np.asarray(x) / cell_km).astype(np.int64)
+    cell_y = np.floor(np.asarray(y) / cell_km).astype(np.int64)
+    return cell_x * 1_000_000 + cell_y
+
+
+def build_station_index(stations, cell_km, built_from):
+    """
+    Build a grid spatial index over station coordinates.
+
+    Stations are sorted by grid cell so each cell is a contiguous slice that can be
+    found with a binary search over the unique cell keys.
+
+    Args:
+        stations (pd.DataFrame): Stations with stationid, name, address, latitude and longitude.
+        cell_km (float): Grid cell size in kilometres.
+        built_from (str | None): Station change stamp the index was built from.
+
+    Returns:
+        dict[str, np.ndarray]: Index arrays ready to be saved with `save_station_index`.
+    """
+    stations = stations.dropna(subset=['latitude', 'longitude'])
+    latitude = stations['latitude'].astype(float).to_numpy()
+    longitude = stations['longitude'].astype(float).to_numpy()
+    x, y = project(latitude, longitude)
+    keys = cell_keys(x, y, cell_km)
+
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    unique_keys, cell_starts = np.unique(sorted_keys, return_index=True)
+    cell_ends = np.append(cell_starts[1:], len(sorted_keys))
+
+    return {
+        'stationid': stations['stationid'].to_numpy(dtype=str)[order],
+        'name': stations['name'].to_numpy(dtype=str)[order],
+        'address': stations['address'].to_numpy(dtype=str)[order],
+        'latitude': latitude[order],
+        'longitude': longitude[order],
+        'cell_keys': unique_keys,
+        'cell_starts': cell_starts,
+        'cell_ends': cell_ends,
+        'cell_km': np.array(cell_km),
+        'built_from': np.array(built_from or ""),
+    }
+
+
+def save_station_index(index, file_path=index_file):
+    """
+    Save the spatial index to disk.
+
+    Args:
+        index (dict[str, np.ndarray]): Index created by `build_station_index`.
+        file_path (str): Path of the .npz file.
+    """
+    np.savez(file_path, **index)
+    logger.info(f"Station index saved to {file_path} with {len(index['stationid'])} stations")
+
+
+def load_station_index(file_path=index_file):
+    """
+    Load the spatial index from disk.
+
+    Args:
+        file_path (str): Path of the .npz file.
+
+    Returns:
+        dict[str, np.ndarray] | None: Index arrays, or None if no index has been saved.
+    """
+    if not os.path.exists(file_path):
+        return None
+    with np.load(file_path) as saved:
+        return {key: saved[key] for key in saved.files}
+
+
+def get_station_index(engine, config):
+    """
+    Load the persisted spatial index, rebuilding it when module 3 has reported station changes.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): Database engine.
+        config (dict): Loaded config.json.
+
+    Returns:
+        dict[str, np.ndarray]: Current spatial index.
+    """
+    last_station_change = config.get("last_station_change")
+    cell_km = float(config.get("station_index_cell_km", 2.0))
+
+    index = load_station_index()
+    if index is not None and str(index['built_from']) == (last_station_change or "") and float(index['cell_km']) == cell_km:
+        return index
+
+    logger.info("Rebuilding station index from dim_fuel_stations")
+    station_query = """
+    SELECT
+        stationid,
+        name,
+        address,
+        latitude,
+        longitude
+    FROM
+        dim_fuel_stations
+    WHERE
+        active = True
+    """
+    stations = pd.read_sql(station_query, engine)
+    index = build_station_index(stations, cell_km, last_station_change)
+    save_station_index(index)
+    return index
+
+
+def stations_within(index, latitude, longitude, radius_km):
+    """
+    Find every station within a radius of a point.
+
+    Only the grid cells overlapping the search square are visited, then exact
+    great-circle distances are calculated for the stations in those cells.
+
+    Args:
+        index (dict[str, np.ndarray]): Spatial index.
+        latitude (float): Latitude of the point in degrees.
+        longitude (float): Longitude of the point in degrees.
+        radius_km (float): Search radius in kilometres.
+
+    Returns:
+        pd.DataFrame: stationid, name, address and distance_km of the stations in range, nearest first.
+    """
+    cell_km = float(index['cell_km'])
+    x, y = project(latitude, longitude)
+
+    # Cells overlapping the rectangle around the search circle, widened east-west because
+    # the projection shrinks longitudes further from the reference latitude than it should
+    furthest_latitude = min(abs(latitude) + np.degrees(radius_km / EARTH_RADIUS_KM), 89.0)
+    half_width = radius_km * np.cos(np.radians(REFERENCE_LATITUDE)) / np.cos(np.radians(furthest_latitude))
+    half_width = max(half_width, radius_km)
+    cell_x = np.arange(np.floor((x - half_width) / cell_km), np.floor((x + half_width) / cell_km) + 1).astype(np.int64)
+    cell_y = np.arange(np.floor((y - radius_km) / cell_km), np.floor((y + radius_km) / cell_km) + 1).astype(np.int64)
+    search_keys = (cell_x[:, None] * 1_000_000 + cell_y[None, :]).ravel()
+
+    # Binary search for the occupied cells
+    if len(index['cell_keys']) == 0:
+        found = np.array([], dtype=np.int64)
+    else:
+        positions = np.minimum(np.searchsorted(index['cell_keys'], search_keys), len(index['cell_keys']) - 1)
+        found = positions[index['cell_keys'][positions] == search_keys]
+
+    if len(found) == 0:
+        return pd.DataFrame(columns=['stationid', 'name', 'address', 'distance_km'])
+
+    candidates = np.concatenate([np.arange(index['cell_starts'][cell], index['cell_ends'][cell]) for cell in found])
+    distance = haversine_km(latitude, longitude, index['latitude'][candidates], index['longitude'][candidates])
+    in_range = distance <= radius_km
+
+    return (
+        pd.DataFrame({
+            'stationid': index['stationid'][candidates][in_range],
+            'name': index['name'][candidates][in_range],
+            'address': index['address'][candidates][in_range],
+            'distance_km': distance[in_range],
+        })
+        .sort_values('distance_km')
+        .reset_index(drop=True)
+    )
+
+
+def cheapest_within(engine, index, latitude, longitude, radius_km, fuelcode, date):
+    """
+    Find the cheapest stations selling a fuel within a radius of a point on a date.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): Database engine.
+        index (dict[str, np.ndarray]): Spatial index.
+        latitude (float): Latitude of the point in degrees.
+        longitude (float): Longitude of the point in degrees.
+        radius_km (float): Search radius in kilometres.
+        fuelcode (str): Fuel code, e.g. 'E10'.
+        date (datetime.date): Price date.
+
+    Returns:
+        pd.DataFrame: Stations in range with their price, cheapest (then nearest) first.
+    """
+    nearby = stations_within(index, latitude, longitude, radius_km)
+    if nearby.empty:
+        return nearby.assign(price=pd.Series(dtype=float))
+
+    price_query = text("""
+    SELECT
+        stationid,
+        price
+    FROM
+        public.fact_fuel_prices
+    WHERE
+        date = :date
+        AND fuelcode = :fuelcode
+        AND stationid IN :stationids
+    """).bindparams(bindparam("stationids", expanding=True))
+
+    prices = pd.read_sql(
+        price_query,
+        engine,
+        params={"date": date, "fuelcode": fuelcode, "stationids": nearby['stationid'].tolist()}
+    )
+    prices['stationid'] = prices['stationid'].astype(str)
+
+    return (
+        nearby
+        .merge(prices, on='stationid', how='inner')
+        .sort_values(['price', 'distance_km'])
+        .reset_index(drop=True)
+    )
+
+# ----------------------------------------------------------------------------------------------------
+#                                     Script Body - Start
+# ----------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cheapest fuel within a radius of a point on a date")
+    parser.add_argument("--lat", type=float, required=True)
+    parser.add_argument("--lon", type=float, required=True)
+    parser.add_argument("--radius-km", type=float, default=5.0)
+    parser.add_argument("--fuelcode", required=True)
+    parser.add_argument("--date", required=True, help="YYYY-MM-DD")
+    args = parser.parse_args()
+
+    with open("config.json") as json_file:
+        config = json.load(json_file)
+
+    engine = create_engine(os.getenv("DB_CONNECTION_STRING"))
+    index = get_station_index(engine, config)
+    result = cheapest_within(
+        engine,
+        index,
+        args.lat,
+        args.lon,
+        args.radius_km,
+        args.fuelcode,
+        datetime.strptime(args.date, "%Y-%m-%d").date()
+    )
+    print(result.to_string(index=False))
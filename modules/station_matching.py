@@ -0,0 +1,349 @@
+# Import necessary libraries
+from collections import defaultdict
+from difflib import SequenceMatcher
+import json
+import logging
+import os
+import re
+
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+#                                       setup variables
+# ----------------------------------------------------------------------------------------------------
+
+# Create logger with dummy name so it can be scaled later if needed
+logger = logging.getLogger("log_dog")
+
+# Resolved CSV station (name|address) -> stationid mappings from earlier runs
+match_cache_file = "data and logs/station_matches.json"
+
+# Address parts as parsed by module 3 for dim_fuel_stations
+STREET_PATTERN = r'((?:\d+|Corner|Cnr).+?),'
+TOWN_PATTERN = r',\s(\D+)\sNSW\s\d+'
+POSTCODE_PATTERN = r'NSW\s(\d+)'
+
+# First street number of a normalised street, e.g. '12' in '12 great western highway'
+STREET_NUMBER_PATTERN = re.compile(r'\b(\d+[a-z]?)\b')
+
+# Street words expanded before addresses are compared
+ABBREVIATIONS = {
+    "st": "street",
+    "rd": "road",
+    "hwy": "highway",
+    "ave": "avenue",
+    "av": "avenue",
+    "pde": "parade",
+    "dr": "drive",
+    "cnr": "corner",
+    "tce": "terrace",
+    "cres": "crescent",
+    "pl": "place",
+    "blvd": "boulevard",
+    "mt": "mount",
+}
+
+# Default matching rules (overridden by `station_matching` in config.json)
+MATCH_RULES = {
+    "min_score": 0.85,        # weighted similarity needed to accept a match
+    "name_weight": 0.4,       # share of the score from the station name (the rest from the street)
+    "postcode_penalty": 0.1,  # subtracted when the candidate is in a different postcode
+    "max_token_block": 25,    # name tokens shared by more stations are not used for blocking
+}
+
+# ----------------------------------------------------------------------------------------------------
+#                                       Defining functions
+# ----------------------------------------------------------------------------------------------------
+
+def parse_address(address):
+    """
+    Split station addresses into street, town and postcode.
+
+    Args:
+        address (pd.Series): Addresses such as '1 Smith St, Penrith NSW 2750'.
+
+    Returns:
+        pd.DataFrame: street, town (title case) and postcode columns, aligned with the addresses.
+    """
+    return pd.DataFrame({
+        'street': address.str.extract(STREET_PATTERN, expand=False).str.title(),
+        'town': address.str.extract(TOWN_PATTERN, expand=False).str.title(),
+        'postcode': address.str.extract(POSTCODE_PATTERN, expand=False),
+    }, index=address.index)
+
+
+def normalize_text(values):
+    """
+    Normalise names or addresses for comparison: lower case, punctuation removed,
+    street abbreviations expanded and whitespace collapsed.
+
+    Args:
+        values (pd.Series): Text to normalise.
+
+    Returns:
+        pd.Series: Normalised text ('' for missing values).
+    """
+    tokens = (
+        values.fillna("")
+        .str.casefold()
+        .str.replace(r"[^a-z0-9]+", " ", regex=True)
+        .str.split()
+    )
+    return tokens.map(lambda words: " ".join(ABBREVIATIONS.get(word, word) for word in words))
+
+
+def match_key(name, address):
+    """
+    Combine a CSV station name and address into a match cache key.
+
+    Args:
+        name (str | pd.Series): Station name as published in the CSV.
+        address (str | pd.Series): Station address as published in the CSV.
+
+    Returns:
+        str | pd.Series: Cache key.
+    """
+    return name + "|" + address
+
+
+def prepare_stations(names, addresses):
+    """
+    Normalise station names and addresses into the fields used for matching.
+
+    Args:
+        names (pd.Series): Station names.
+        addresses (pd.Series): Station addresses.
+
+    Returns:
+        pd.DataFrame: name, street (normalised street, or the whole address when no
+        street is parsed), number (first street number, '' when none), postcode and
+        exact (normalised name and address) columns.
+    """
+    parsed = parse_address(addresses.fillna(""))
+    name = normalize_text(names).to_numpy()
+    address = normalize_text(addresses).to_numpy()
+    street = normalize_text(parsed['street']).to_numpy()
+    return pd.DataFrame({
+        'name': name,
+        'street': [street_value or address_value for street_value, address_value in zip(street, address)],
+        'number': [
+            match.group(1) if (match := STREET_NUMBER_PATTERN.search(street_value)) else ""
+            for street_value in street
+        ],
+        'postcode': parsed['postcode'].fillna("").to_numpy(),
+        'exact': [f"{name_value}|{address_value}" for name_value, address_value in zip(name, address)],
+    })
+
+
+def build_blocking_index(prepared, max_token_block):
+    """
+    Group stations by postcode and by name token, so a CSV station is only scored
+    against stations sharing its postcode or a distinctive name word.
+
+    Args:
+        prepared (pd.DataFrame): Stations from `prepare_stations`.
+        max_token_block (int): Name tokens shared by more stations than this (brands,
+            'service', 'station') are dropped from the index.
+
+    Returns:
+        tuple[dict[str, list[int]], dict[str, list[int]]]: Station positions by postcode and by name token.
+    """
+    by_postcode = defaultdict(list)
+    by_token = defaultdict(list)
+    for position, (name, postcode) in enumerate(zip(prepared['name'], prepared['postcode'])):
+        if postcode:
+            by_postcode[postcode].append(position)
+        for token in set(name.split()):
+            by_token[token].append(position)
+
+    by_token = {token: positions for token, positions in by_token.items() if len(positions) <= max_token_block}
+    return dict(by_postcode), by_token
+
+
+def best_match(name, street, number, postcode, prepared, by_postcode, by_token, rules):
+    """
+    Score a CSV station against its blocked candidates and return the best one.
+
+    Candidates with a different street number are never matched (neighbouring
+    stations on one road score highly otherwise). Candidates whose quick similarity
+    upper bound cannot beat the best score so far are skipped before the full
+    `SequenceMatcher` comparison.
+
+    Args:
+        name (str): Normalised CSV station name.
+        street (str): Normalised CSV street.
+        number (str): CSV street number ('' when none).
+        postcode (str): CSV postcode.
+        prepared (pd.DataFrame): Stations from `prepare_stations`.
+        by_postcode (dict[str, list[int]]): Blocking index by postcode.
+        by_token (dict[str, list[int]]): Blocking index by name token.
+        rules (dict): Matching rules.
+
+    Returns:
+        tuple[int | None, float]: Position of the best station (None if no candidate) and its score.
+    """
+    candidates = set(by_postcode.get(postcode, []))
+    for token in set(name.split()):
+        candidates.update(by_token.get(token, []))
+
+    name_weight = rules['name_weight']
+    best_position, best_score = None, 0.0
+    for position in candidates:
+        candidate_number = prepared['number'].iat[position]
+        if number and candidate_number and number != candidate_number:
+            continue
+
+        penalty = 0.0 if prepared['postcode'].iat[position] == postcode else rules['postcode_penalty']
+        name_matcher = SequenceMatcher(None, name, prepared['name'].iat[position])
+        street_matcher = SequenceMatcher(None, street, prepared['street'].iat[position])
+
+        bound = name_weight * name_matcher.quick_ratio() + (1 - name_weight) * street_matcher.quick_ratio() - penalty
+        if bound <= best_score:
+            continue
+
+        score = name_weight * name_matcher.ratio() + (1 - name_weight) * street_matcher.ratio() - penalty
+        if score > best_score:
+            best_position, best_score = position, score
+
+    return best_position, best_score
+
+
+def load_match_cache():
+    """
+    Load the resolved station mappings of earlier runs.
+
+    Returns:
+        dict[str, dict]: stationid and score by match key (empty if no cache exists).
+    """
+    if not os.path.exists(match_cache_file):
+        return {}
+    with open(match_cache_file) as json_file:
+        return json.load(json_file)
+
+
+def save_match_cache(cache):
+    """
+    Save the resolved station mappings.
+
+    Args:
+        cache (dict[str, dict]): stationid and score by match key.
+    """
+    with open(match_cache_file, "w") as json_file:
+        json.dump(cache, json_file, indent=4, sort_keys=True)
+    logger.info(f"Station match cache saved with {len(cache)} mappings")
+
+
+def resolve_stations(csv_stations, stations, cache, rules=None, fuzzy=True):
+    """
+    Resolve CSV station names and addresses to `dim_fuel_stations` stationids.
+
+    Mappings cached by earlier runs are reused while their station is still active,
+    so only new name/address strings are matched. New strings are first looked up by
+    their normalised name and address; only these exact matches are cached.
+
+    With `fuzzy`, the remaining strings are scored against the stations blocked by
+    postcode and name token. Fuzzy matches are used for the run but never cached, and
+    are dropped when another CSV string of the same frame (a month of price reports)
+    resolves to the same station, since two strings reporting prices side by side are
+    two stations. Callers should only enable it once module 3 has refreshed
+    `dim_fuel_stations`, so a new station is not matched to a neighbour.
+
+    Args:
+        csv_stations (pd.DataFrame): servicestationname and address columns (duplicates allowed).
+        stations (pd.DataFrame): Active stations with stationid, name and address columns.
+        cache (dict[str, dict]): Match cache from `load_match_cache`; new exact matches are
+            added to it (saved by the caller with `save_match_cache`).
+        rules (dict | None): Overrides of `MATCH_RULES`.
+        fuzzy (bool): Whether strings with no exact match are scored against similar stations.
+
+    Returns:
+        pd.DataFrame: One row per distinct CSV station with servicestationname, address,
+        stationid (None when unresolved) and score.
+    """
+    rules = {**MATCH_RULES, **(rules or {})}
+
+    csv_stations = csv_stations[['servicestationname', 'address']].dropna().drop_duplicates().reset_index(drop=True)
+    keys = match_key(csv_stations['servicestationname'], csv_stations['address'])
+
+    active_ids = set(stations['stationid'].astype(str))
+    cached = keys.map(
+        lambda key: key in cache and cache[key]['stationid'] in active_ids and cache[key]['score'] == 1.0
+    ).to_numpy(dtype=bool)
+
+    stationids = keys.map(lambda key: cache[key]['stationid'] if key in cache else None).where(cached, None)
+    scores = keys.map(lambda key: cache[key]['score'] if key in cache else None).where(cached, None)
+
+    new = csv_stations[~cached]
+    if not new.empty:
+        logger.info(f"Matching {len(new)} new station name/address strings ({cached.sum()} cached)")
+        station_ids = stations['stationid'].astype(str).to_numpy()
+        prepared = prepare_stations(stations['name'], stations['address'])
+        exact = dict(zip(prepared['exact'], station_ids))
+        by_postcode, by_token = build_blocking_index(prepared, int(rules['max_token_block']))
+
+        new_prepared = prepare_stations(new['servicestationname'], new['address'])
+        fuzzy_matches = []
+        for row, index in enumerate(new.index):
+            stationid = exact.get(new_prepared['exact'].iat[row])
+            if stationid is not None:
+                stationids.at[index], scores.at[index] = stationid, 1.0
+                cache[keys.at[index]] = {"stationid": stationid, "score": 1.0}
+                continue
+            if not fuzzy:
+                continue
+
+            position, score = best_match(
+                new_prepared['name'].iat[row], new_prepared['street'].iat[row],
+                new_prepared['number'].iat[row], new_prepared['postcode'].iat[row],
+                prepared, by_postcode, by_token, rules
+            )
+            if position is not None and score >= rules['min_score']:
+                stationids.at[index], scores.at[index] = station_ids[position], round(float(score), 4)
+                fuzzy_matches.append(index)
+
+        # A station matched by more than one string of the frame is not one station renamed
+        shared = stationids.notna() & stationids.duplicated(keep=False)
+        rejected = [index for index in fuzzy_matches if shared.at[index]]
+        if rejected:
+            logger.warning(f"{len(rejected)} fuzzy station matches dropped - their station also reports under another name/address")
+            stationids.loc[rejected] = None
+            scores.loc[rejected] = None
+
+        unresolved = int(stationids.isna().sum())
+        if unresolved:
+            logger.warning(f"{unresolved} station name/address strings could not be matched to a stationid")
+
+    return csv_stations.assign(stationid=stationids, score=scores)
+
+
+def canonical_station_names(frame, matches, stations, name_column='servicestationname', address_column='address'):
+    """
+    Replace matched CSV station names and addresses with the `dim_fuel_stations` name
+    and address of their stationid, so drifted strings of one station collapse to one key.
+
+    Args:
+        frame (pd.DataFrame): Rows to rewrite.
+        matches (pd.DataFrame): Mappings from `resolve_stations`.
+        stations (pd.DataFrame): Active stations with stationid, name and address columns.
+        name_column (str): Station name column of the frame.
+        address_column (str): Station address column of the frame.
+
+    Returns:
+        pd.DataFrame: The frame with matched names and addresses replaced (unmatched rows unchanged).
+    """
+    canonical = (
+        matches.dropna(subset=['stationid'])
+        .merge(
+            stations[['stationid', 'name', 'address']].astype({'stationid': str}),
+            on='stationid', suffixes=('', '_station')
+        )
+        .drop_duplicates(subset=['servicestationname', 'address'])
+    )
+    lookup = pd.MultiIndex.from_frame(canonical[['servicestationname', 'address']])
+    positions = lookup.get_indexer(pd.MultiIndex.from_frame(frame[[name_column, address_column]]))
+    matched = positions >= 0
+
+    frame = frame.copy()
+    frame.loc[matched, name_column] = canonical['name'].to_numpy()[positions[matched]]
+    frame.loc[matched, address_column] = canonical['address_station'].to_numpy()[positions[matched]]
+    return frame
@@ -1,10 +1,15 @@
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import fcntl
 import json
 import logging
 import os
 import subprocess
 import sys
 
+from modules.pipeline_logging import flush_logs, start_log_server
+from modules.sources import DEFAULT_SOURCE, get_source
+
 # ----------------------------------------------------------------------------------------------------
 #                                       Setup Variables
 # ----------------------------------------------------------------------------------------------------
@@ -12,39 +17,66 @@ import sys
 os.makedirs("data and logs", exist_ok=True)
 datetimestamp = datetime.now().strftime("%Y%m%d_%Hh%M")
 log_file = f"data and logs/workflow_{datetimestamp}.log"
-
-# Set up logging for orchestrator
-logging.basicConfig(
-    filename=log_file,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s -   Orchestrator   - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
+config_file = "config.json"
+current_monthyear = datetime.now().replace(day=1).strftime("%b%Y").lower()
+
+# Modules in run order
+modules = [
+    "modules/1.file_retrieval.py",
+    "modules/2.transform_data.py",
+    "modules/3.api_integration.py",
+    "modules/4.data_quality.py",
+    "modules/5.price_rollups.py",
+    "modules/6.price_anomalies.py",
+    "modules/99.retention_policy.py",
+]
+
+# Modules run once per source (retrieval and transform), the others run on the NSW tables only
+source_modules = modules[:2]
+
+# Lock file held while pushing, so sources running side by side do not interleave git commands
+git_lock_file = os.path.join(".git", "pipeline_push.lock")
+
+# Set up logging for orchestrator - the log server is the single writer of the log file,
+# module subprocesses send their records to it over a local socket
+with open(config_file) as json_file:
+    orchestrator_config = json.load(json_file)
+log_level = orchestrator_config.get("log_level", "INFO")
+log_server = start_log_server(log_file, "Orchestrator", log_level)
 
 # Create logger with dummy name so it can be scaled later if needed
 logger = logging.getLogger("log_dog")
 
+# Datasets to retrieve and transform, and how many run at the same time
+sources = orchestrator_config.get("sources", [DEFAULT_SOURCE])
+source_concurrency = int(orchestrator_config.get("source_concurrency", 2))
+
 # ----------------------------------------------------------------------------------------------------
 #                                       Setup Functions
 # ----------------------------------------------------------------------------------------------------
 
 def push_file_to_repo(file_path, commit_message):
     """Adds, commits, and pushes a file to GitHub using GITHUB_TOKEN"""
+    # Make sure every queued record is in the log file before it is committed
+    if file_path == log_file:
+        flush_logs(log_server)
     try:
         repo_url = (
             f"https://x-access-token:{os.environ['GITHUB_TOKEN']}"
             f"@github.com/{os.environ['GITHUB_REPOSITORY']}.git"
         )
         
-        subprocess.run(["git", "config", "user.name", "github-actions"], check=True)
-        subprocess.run(["git", "config", "user.email", "github-actions@github.com"], check=True)
-        subprocess.run(["git", "add", file_path], check=True)
-        subprocess.run(
-            ["git", "commit", "-m", commit_message],
-            check=False  # won't fail if nothing changed
-        )
-        
-        subprocess.run(["git", "push", repo_url, "HEAD:main"], check=True)
+        with open(git_lock_file, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            subprocess.run(["git", "config", "user.name", "github-actions"], check=True)
+            subprocess.run(["git", "config", "user.email", "github-actions@github.com"], check=True)
+            subprocess.run(["git", "add", file_path], check=True)
+            subprocess.run(
+                ["git", "commit", "-m", commit_message],
+                check=False  # won't fail if nothing changed
+            )
+
+            subprocess.run(["git", "push", repo_url, "HEAD:main"], check=True)
 
         logger.info(f"Successfully pushed {file_path} to repo")
 
@@ -64,35 +96,112 @@ def save_log_and_config():
     push_file_to_repo(config_file,f"successful run - configfile updated {datetimestamp}")
 
 
-def run_module(module_path):
-    """Runs python files as a subprocess"""
+def load_config(source=DEFAULT_SOURCE):
+    """Reads the current config state of a source (config.json for NSW)"""
+    with open(get_source(source).config_file) as json_file:
+        return json.load(json_file)
+
+
+def preflight_skip_reason(module_path, config):
+    """
+    Evaluates a module's config.json skip condition without launching it.
+    Mirrors the guard at the top of each module so modules with no work are
+    never started (no interpreter start, heavy imports or database engine).
+
+    Returns:
+        str | None: Reason the module would skip, or None if it has work to do.
+    """
+    if module_path == "modules/1.file_retrieval.py":
+        revision_check_days = int(config.get("revision_check_days", 7))
+        last_revision_check = config.get("last_revision_check")
+        revision_check_due = revision_check_days > 0 and (
+            last_revision_check is None
+            or datetime.now() - datetime.strptime(last_revision_check, "%Y%m%d_%Hh%M") >= timedelta(days=revision_check_days)
+        )
+        if not revision_check_due:
+            if config["next_file_date"] == current_monthyear:
+                return f"{config['latest_file']} data file already loaded"
+            if config["latest_file"] != config["last_transformation"]:
+                return f"{config['latest_file']} file has not yet been transformed"
+
+    elif module_path == "modules/2.transform_data.py":
+        if config["latest_file"] == config["last_transformation"] and not config.get("reprocess_months"):
+            return f"{config['latest_file']} file has already been transformed"
+
+    elif module_path == "modules/3.api_integration.py":
+        if config["latest_file"] == config["last_API_call_update"]:
+            return f"{config['latest_file']} station dictionary already up to date"
+
+    elif module_path == "modules/4.data_quality.py":
+        if (
+            config.get("last_data_quality") == [config.get("last_transformed_date"), config.get("last_API_call")]
+            and not config.get("data_quality_months")
+        ):
+            return "no new staging data since the last data quality check"
+
+    elif module_path == "modules/5.price_rollups.py":
+        if config.get("last_rollup") == config.get("last_transformed_date") and not config.get("rollup_months"):
+            return f"rollups already up to date to {config.get('last_transformed_date')}"
+
+    elif module_path == "modules/6.price_anomalies.py":
+        if config.get("last_anomaly_check") == config.get("last_transformed_date") and not config.get("anomaly_months"):
+            return f"anomaly checks already up to date to {config.get('last_transformed_date')}"
+
+    return None
+
+
+def run_module(module_path, source=DEFAULT_SOURCE):
+    """Runs python files as a subprocess (for one source when the module runs per source)"""
+    source_args = ["--source", source] if module_path in source_modules else []
+    module_path_label = module_path if source == DEFAULT_SOURCE else f"{module_path} ({source})"
     try:
-        logger.info(f"Starting {module_path}")
+        # Re-check the skip condition as earlier modules may have updated the config
+        skip_reason = preflight_skip_reason(module_path, load_config(source))
+        if skip_reason is not None:
+            logger.info(f"Preflight: {skip_reason} - Skipping {module_path_label}")
+            return
+
+        logger.info(f"Starting {module_path_label}")
 
         result = subprocess.run(
-            ["python", module_path, "--log-file", log_file],
+            [
+                "python", module_path,
+                "--log-file", log_file,
+                "--log-port", str(log_server.port),
+                "--log-level", log_level,
+                *source_args
+            ],
             check=False, # We use check=False and handle errors via returncode
             capture_output=True,
             text=True
         )
+
+        # Write the module's records before logging anything else
+        flush_logs(log_server)
         if result.returncode == 10:
-            logger.info(f"Conditions not met in {module_path} - Skipping Module")
+            logger.info(f"Conditions not met in {module_path_label} - Skipping Module")
             return
 
         # Logger comment for normal flow 
-        logger.info(f"Finished {module_path}")
+        logger.info(f"Finished {module_path_label}")
         
         if result.returncode != 0:
-            logger.error(f"Module {module_path} failed with exit code {result.returncode}")
-            logger.error(f"{module_path} errors before failure:\n{result.stderr}")
-            push_file_to_repo(log_file, f"Workflow log before failure in {module_path}")
+            logger.error(f"Module {module_path_label} failed with exit code {result.returncode}")
+            logger.error(f"{module_path_label} errors before failure:\n{result.stderr}")
+            push_file_to_repo(log_file, f"Workflow log before failure in {module_path_label}")
             sys.exit(1)
 
     except Exception as e:
-        logger.exception(f"Unexpected error running {module_path}: {e}")
-        push_file_to_repo(log_file, f"Workflow log before failure in {module_path}")
+        logger.exception(f"Unexpected error running {module_path_label}: {e}")
+        push_file_to_repo(log_file, f"Workflow log before failure in {module_path_label}")
         raise
 
+
+def run_source(source):
+    """Retrieves and transforms the files of one source (modules 1 and 2 in order)"""
+    run_module("modules/1.file_retrieval.py", source)
+    run_module("modules/2.transform_data.py", source)
+
 # ----------------------------------------------------------------------------------------------------
 #                                     Script Body - Start
 # ----------------------------------------------------------------------------------------------------
@@ -100,11 +209,20 @@ def run_module(module_path):
 # -------------------- Basic logging and config updates
 logger.info("Starting orchestrator")
 
-# -------------------- Module 1 
-run_module("modules/1.file_retrieval.py")
-
-# -------------------- Module 2
-run_module("modules/2.transform_data.py")
+# -------------------- Preflight plan from the starting config state
+starting_configs = {source: load_config(source) for source in sources}
+planned = [
+    module_path if source == DEFAULT_SOURCE else f"{module_path} ({source})"
+    for source in sources
+    for module_path in (modules if source == DEFAULT_SOURCE else source_modules)
+    if preflight_skip_reason(module_path, starting_configs[source]) is None
+]
+logger.info(f"Preflight plan - modules with work: {', '.join(planned) if planned else 'none'}")
+
+# -------------------- Modules 1 & 2 per source
+# Sources run side by side (at most `source_concurrency` at once), each module in order within a source
+with ThreadPoolExecutor(max_workers=source_concurrency) as executor:
+    list(executor.map(run_source, sources))
 
 # -------------------- Module 3
 run_module("modules/3.api_integration.py")
@@ -112,13 +230,17 @@ run_module("modules/3.api_integration.py")
 # -------------------- Module 4
 run_module("modules/4.data_quality.py")
 
+# -------------------- Module 5
+run_module("modules/5.price_rollups.py")
+
+# -------------------- Module 6
+run_module("modules/6.price_anomalies.py")
+
 # -------------------- Retention Policy
 run_module("modules/99.retention_policy.py")
 
 # -------------------- Update config and save log
-config_file = "config.json"
-with open("config.json") as json_file:
-    config = json.load(json_file)
+config = load_config()
 config["last_run_date"] = datetimestamp
 save_log_and_config()
 
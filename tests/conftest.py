@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Helper modules are imported by name, as the pipeline scripts do when run from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from file_downloads import rank_links, retrieve_months
+
+# Served files by path - the CSV files are larger than the xlsx files, so ranking is by format not size
+FILES = {f"/{month}.csv": b"x" * 200 for month in ["jan2026", "mar2026", "apr2026", "may2026", "jun2026"]}
+FILES.update({f"/{month}.xlsx": b"x" * 100 for month in ["jan2026", "feb2026", "mar2026", "apr2026", "may2026", "jun2026"]})
+
+
+class FileHandler(BaseHTTPRequestHandler):
+    """Serves `FILES` (404 otherwise) and records how many requests run at once."""
+
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+    downloads = []
+
+    def respond(self, with_body):
+        with FileHandler.lock:
+            FileHandler.active += 1
+            FileHandler.max_active = max(FileHandler.max_active, FileHandler.active)
+            if with_body:
+                FileHandler.downloads.append(self.path)
+        try:
+            time.sleep(0.05)
+            content = FILES.get(self.path)
+            if content is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(content)))
+            self.send_header("ETag", f'"{self.path}"')
+            self.end_headers()
+            if with_body:
+                self.wfile.write(content)
+        finally:
+            with FileHandler.lock:
+                FileHandler.active -= 1
+
+    def do_HEAD(self):
+        self.respond(with_body=False)
+
+    def do_GET(self):
+        self.respond(with_body=True)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    FileHandler.active, FileHandler.max_active, FileHandler.downloads = 0, 0, []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FileHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def month_links(server, months):
+    return {month: [f"{server}/{month}.xlsx", f"{server}/{month}.csv"] for month in months}
+
+
+def test_rank_links_puts_csv_first():
+    assert rank_links([("a.xlsx", 100), ("a.csv", 200)]) == ["a.csv", "a.xlsx"]
+    assert rank_links([("a.csv", None), ("b.csv", 50), ("a.xlsx", 10)]) == ["b.csv", "a.csv", "a.xlsx"]
+
+
+def test_retrieve_months_prefers_csv_and_falls_back_to_xlsx(server):
+    downloads = asyncio.run(retrieve_months(month_links(server, ["jan2026", "feb2026"]), concurrency=2))
+
+    link, content, etag = downloads["jan2026"]
+    assert link == f"{server}/jan2026.csv"
+    assert content == FILES["/jan2026.csv"]
+    assert etag == '"/jan2026.csv"'
+
+    # The CSV returns 404, so the xlsx is downloaded instead
+    link, content, etag = downloads["feb2026"]
+    assert link == f"{server}/feb2026.xlsx"
+    assert content == FILES["/feb2026.xlsx"]
+
+
+def test_retrieve_months_respects_concurrency_limit(server):
+    months = ["jan2026", "mar2026", "apr2026", "may2026", "jun2026"]
+    downloads = asyncio.run(retrieve_months(month_links(server, months), concurrency=2))
+
+    assert all(content is not None for link, content, etag in downloads.values())
+    assert sorted(FileHandler.downloads) == sorted(f"/{month}.csv" for month in months)
+    assert FileHandler.max_active == 2
@@ -0,0 +1,49 @@
+import pandas as pd
+import pandas.testing as pdt
+
+from price_intervals import KEY_COLUMNS, expand_price_intervals, price_intervals
+
+
+def daily_prices():
+    """Daily output of two station-fuels covering carried prices, repeated updates, changes and a gap."""
+    rows = [
+        # Seeded price carried from 1 Feb, re-reported unchanged on 3 and 5 Feb, changed on 7 Feb
+        ("A", "1 Smith St", "E10", "2026-02-01", 180.0, None),
+        ("A", "1 Smith St", "E10", "2026-02-02", 180.0, None),
+        ("A", "1 Smith St", "E10", "2026-02-03", 180.0, "2026-02-03"),
+        ("A", "1 Smith St", "E10", "2026-02-04", 180.0, None),
+        ("A", "1 Smith St", "E10", "2026-02-05", 180.0, "2026-02-05"),
+        ("A", "1 Smith St", "E10", "2026-02-06", 180.0, None),
+        ("A", "1 Smith St", "E10", "2026-02-07", 185.5, "2026-02-07"),
+        # First price on 2 Feb, missing 4 Feb, same price again from 5 Feb
+        ("B", "2 Main Rd", "U91", "2026-02-02", 170.0, "2026-02-02"),
+        ("B", "2 Main Rd", "U91", "2026-02-03", 170.0, None),
+        ("B", "2 Main Rd", "U91", "2026-02-05", 170.0, None),
+        ("B", "2 Main Rd", "U91", "2026-02-06", 170.0, None),
+    ]
+    output = pd.DataFrame(rows, columns=KEY_COLUMNS + ['date', 'price', 'priceupdateddate'])
+    output['date'] = pd.to_datetime(output['date'])
+    output['priceupdateddate'] = pd.to_datetime(output['priceupdateddate'])
+    return output
+
+
+def test_expand_price_intervals_round_trip():
+    output = daily_prices()
+
+    intervals = price_intervals(output)
+    expanded = expand_price_intervals(intervals)
+
+    pdt.assert_frame_equal(expanded, output, check_dtype=False)
+    assert len(intervals) == 6
+
+
+def test_update_dates_stay_on_their_day():
+    intervals = price_intervals(daily_prices())
+
+    first_interval = intervals.iloc[0]
+    assert first_interval['valid_from'] == pd.Timestamp("2026-02-01")
+    assert first_interval['valid_to'] == pd.Timestamp("2026-02-02")
+    assert pd.isna(first_interval['priceupdateddate'])
+
+    updated = intervals.dropna(subset=['priceupdateddate'])
+    assert (updated['priceupdateddate'] == updated['valid_from']).all()
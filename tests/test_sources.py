@@ -0,0 +1,16 @@
+import pytest
+
+from sources import get_source
+
+
+@pytest.mark.parametrize("href, month", [
+    ("https://data.nsw.gov.au/fuelcheck_pricehistory_jan2026.csv", "jan2026"),
+    ("/files/FuelCheck%20Price%20History%20February%202026.xlsx", "feb2026"),
+    ("price_history_sep_2025.csv", "sep2025"),
+])
+def test_link_month(href, month):
+    assert get_source("nsw").link_month(href) == month
+
+
+def test_link_month_ignores_month_names_inside_words():
+    assert get_source("nsw").link_month("fuelcheck_summary 2025.csv") is None
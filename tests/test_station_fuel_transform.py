@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+import station_fuel_transform
+from station_fuel_transform import (
+    SHARD_OUTPUT, save_shard_inputs, transform_station_fuel, transform_station_fuel_duckdb
+)
+
+
+def transform_inputs(price_dtype=float):
+    """Block One/Two frames for 1-7 Feb covering median ties, a multi-day gap and an unseeded key."""
+    fuel_rows = [
+        # Two reports on 1 Feb (median between them), then nothing until 5 Feb
+        ("A", "1 Smith St", "E10", "2026-02-01", 200),
+        ("A", "1 Smith St", "E10", "2026-02-01", 201),
+        ("A", "1 Smith St", "E10", "2026-02-05", 205),
+        # Four reports on 2 Feb (median of the middle two)
+        ("B", "2 Main Rd", "U91", "2026-02-02", 215),
+        ("B", "2 Main Rd", "U91", "2026-02-02", 216),
+        ("B", "2 Main Rd", "U91", "2026-02-02", 217),
+        ("B", "2 Main Rd", "U91", "2026-02-02", 219),
+        # No seed price, first report on 3 Feb
+        ("C", "3 High St", "P98", "2026-02-03", 230),
+    ]
+    df_fuel_data = pd.DataFrame(fuel_rows, columns=['servicestationname', 'address', 'fuelcode', 'date', 'price'])
+    df_fuel_data['date'] = pd.to_datetime(df_fuel_data['date'])
+    df_fuel_data['price'] = df_fuel_data['price'].astype(price_dtype)
+    if price_dtype is float:
+        df_fuel_data['price'] += 0.1
+
+    union_data = df_fuel_data[['servicestationname', 'address', 'fuelcode']].drop_duplicates().reset_index(drop=True)
+
+    # Seed prices on the last day of January (none for C)
+    last_month_price_data = pd.DataFrame(
+        [("A", "1 Smith St", "E10", "2026-01-31", 198.9), ("B", "2 Main Rd", "U91", "2026-01-31", 214.9)],
+        columns=['name', 'address', 'fuelcode', 'date', 'price']
+    )
+    last_month_price_data['date'] = pd.to_datetime(last_month_price_data['date'])
+
+    date_range_df = pd.DataFrame({'date': pd.date_range("2026-01-31", "2026-02-07", freq="D")})
+    return df_fuel_data, union_data, last_month_price_data, date_range_df
+
+
+def test_pandas_transform_fills_gaps_and_skips_unseeded_days():
+    output = transform_station_fuel(*transform_inputs())
+
+    station_a = output[output['servicestationname'] == "A"].set_index('date')['price']
+    assert station_a.loc["2026-02-01"] == pytest.approx(200.6)
+    assert station_a.loc["2026-02-04"] == pytest.approx(200.6)
+    assert station_a.loc["2026-02-05"] == pytest.approx(205.1)
+
+    station_c = output[output['servicestationname'] == "C"]
+    assert station_c['date'].min() == pd.Timestamp("2026-02-03")
+    assert output['record_id'].is_unique
+
+
+@pytest.mark.parametrize("price_dtype", [float, int], ids=["decimal_prices", "integer_prices"])
+def test_duckdb_transform_matches_pandas(price_dtype):
+    pytest.importorskip("duckdb")
+    inputs = transform_inputs(price_dtype)
+
+    pandas_output = transform_station_fuel(*inputs).reset_index(drop=True)
+    duckdb_output = transform_station_fuel_duckdb(*inputs).reset_index(drop=True)
+
+    assert sorted(duckdb_output['record_id']) == sorted(pandas_output['record_id'])
+    pdt.assert_frame_equal(duckdb_output, pandas_output, check_dtype=False)
+
+
+def test_shard_worker_matches_in_process_transform(tmp_path):
+    pytest.importorskip("pyarrow")
+    inputs = transform_inputs()
+    folder = str(tmp_path / "0")
+
+    save_shard_inputs(folder, *inputs)
+    subprocess.run([sys.executable, station_fuel_transform.__file__, folder], check=True)
+    shard_output = pd.read_parquet(os.path.join(folder, SHARD_OUTPUT))
+
+    pdt.assert_frame_equal(shard_output, transform_station_fuel(*inputs).reset_index(drop=True), check_dtype=False)
@@ -0,0 +1,56 @@
+import pandas as pd
+
+from station_matching import resolve_stations
+
+
+def active_stations():
+    return pd.DataFrame({
+        'stationid': ["101", "102"],
+        'name': ["7-Eleven Kingswood", "Ampol Foodary Penrith"],
+        'address': ["112 Great Western Highway, Kingswood NSW 2747", "100 High Street, Penrith NSW 2750"],
+    })
+
+
+def csv_stations(rows):
+    return pd.DataFrame(rows, columns=['servicestationname', 'address'])
+
+
+def resolved(matches):
+    return dict(zip(matches['servicestationname'], matches['stationid']))
+
+
+def test_different_street_numbers_are_not_matched():
+    matches = resolve_stations(csv_stations([
+        ("7-Eleven Kingswood East", "12 Great Western Hwy, Kingswood NSW 2747"),
+        ("Ampol Penrith", "10 High St, Penrith NSW 2750"),
+    ]), active_stations(), {})
+
+    assert matches['stationid'].isna().all()
+
+
+def test_fuzzy_match_is_used_but_not_cached():
+    cache = {}
+    matches = resolve_stations(csv_stations([
+        ("Ampol Foodary Penrth", "100 High St, Penrith NSW 2750"),
+        ("7-ELEVEN  Kingswood", "112 Great Western Hwy, Kingswood NSW 2747"),
+    ]), active_stations(), cache)
+
+    assert resolved(matches) == {"Ampol Foodary Penrth": "102", "7-ELEVEN  Kingswood": "101"}
+    assert list(cache) == ["7-ELEVEN  Kingswood|112 Great Western Hwy, Kingswood NSW 2747"]
+
+
+def test_fuzzy_matching_can_be_switched_off():
+    matches = resolve_stations(
+        csv_stations([("Ampol Foodary Penrth", "100 High St, Penrith NSW 2750")]), active_stations(), {}, fuzzy=False
+    )
+
+    assert matches['stationid'].isna().all()
+
+
+def test_station_reporting_under_two_strings_is_not_merged():
+    matches = resolve_stations(csv_stations([
+        ("Ampol Foodary Penrith", "100 High Street, Penrith NSW 2750"),
+        ("Ampol Foodary Penrth", "100 High St, Penrith NSW 2750"),
+    ]), active_stations(), {})
+
+    assert resolved(matches) == {"Ampol Foodary Penrith": "102", "Ampol Foodary Penrth": None}